@@ -12,10 +12,12 @@ def create_app(config_class=Config):
     app.config['ADMIN_PASSWORD'] = os.environ.get('ADMIN_PASSWORD')
     app.config['ADMIN_EMAIL'] = os.environ.get('ADMIN_EMAIL', 'admin@example.com')
 
-    app.config['DEBUG'] = True
-    app.config['TEMPLATES_AUTO_RELOAD'] = True
     app.config.from_object(config_class)
 
+    from app.utils.db_routing import configure_database
+
+    configure_database(app)
+
     # Initialize extensions with app
     db.init_app(app)
     migrate.init_app(app, db)
@@ -24,6 +26,22 @@ def create_app(config_class=Config):
     csrf.init_app(app)
     cors.init_app(app)
 
+    from app.utils.artifact_cache import ticket_cache
+
+    ticket_cache.init_app(app)
+
+    from app.utils.email_dispatcher import email_dispatcher
+
+    email_dispatcher.init_app(app)
+
+    from app.models.user import user_cache
+    from app.utils.login_attempts import login_attempts
+    from app.utils.passwords import password_hasher
+
+    user_cache.init_app(app)
+    login_attempts.init_app(app)
+    password_hasher.init_app(app)
+
     # Configure login
     login_manager.login_view = "auth.login"
     login_manager.login_message_category = "info"
@@ -33,9 +51,20 @@ def create_app(config_class=Config):
 
     app.register_blueprint(auth)
 
-    from app.parking.routes import parking, seed_parking_locations, seed_parking_slots
+    from app.parking.routes import parking
+    from app.parking.drafts import booking_drafts
+    from app.parking.gate import revoked_tickets, ticket_signer
+    from app.parking.gate_snapshot import gate_snapshots
+    from app.parking.plates import active_plates
+    from app.parking.tickets import ticket_renderer
 
     app.register_blueprint(parking)
+    booking_drafts.init_app(app)
+    ticket_signer.init_app(app)
+    revoked_tickets.init_app(app)
+    gate_snapshots.init_app(app)
+    active_plates.init_app(app)
+    ticket_renderer.init_app(app)
 
     from app.admin.routes import admin
 
@@ -58,51 +87,32 @@ def create_app(config_class=Config):
     from app.utils.error_handlers import register_error_handlers
 
     register_error_handlers(app)
+
+    from app.utils.query_stats import register_query_stats
+
+    register_query_stats(app)
+
+    from app.utils.metrics import register_metrics
+
+    register_metrics(app)
+
+    from app.utils.slow_queries import register_slow_query_log
+
+    register_slow_query_log(app)
+
+    from app.utils.email_outbox import register_email_outbox
+
+    register_email_outbox(app)
+
+    from app.cli import register_commands
+
+    register_commands(app)
         
     # Add template context processors
     @app.context_processor
     def utility_processor():
         return {"now": datetime.now}
 
-    with app.app_context():
-        from app.models.user import User
-
-        # Create database tables if they don't exist
-        try:
-            db.create_all()
-
-            admin_email = app.config.get("ADMIN_EMAIL", "admin@example.com")
-            admin_password = app.config.get("ADMIN_PASSWORD", "default-fallback-password")
-
-            admin_user = User.query.filter_by(email=admin_email).first()
-
-            if not admin_user:
-                admin = User(
-                    email=admin_email,
-                    username="admin",
-                    is_admin=True,
-                    first_name="Admin",
-                    last_name="User",
-                )
-                admin.set_password(admin_password)
-                db.session.add(admin)
-                db.session.commit()
-                app.logger.info("Created default admin user")
-            else:
-                admin_user.set_password(admin_password)
-                db.session.commit()
-                app.logger.info("Updated admin password")
-
-            # Seed parking locations if needed
-            seed_parking_locations()
-
-            # Seed parking slots if needed
-            seed_parking_slots()
-
-        except Exception as e:
-            db.session.rollback()
-            app.logger.error(f"Error creating database tables: {str(e)}")
-
     # Shell context
     @app.shell_context_processor
     def make_shell_context():
@@ -3,9 +3,15 @@ from flask_login import login_required, current_user
 from functools import wraps
 from app.models.user import User
 from app.models.booking import Booking
+from app.models.booking_draft import BookingDraft
+from app.models.gate_event import GateEvent
 from app.models.parking_location import ParkingLocation
 from app.models.parking_slot import ParkingSlot
 from app.extensions import db
+from app.parking.gate import record_deleted_bookings, revoked_tickets
+from app.parking.plates import active_plates
+from app.utils.db_routing import read_replica
+from app.utils.unit_of_work import retry_on_conflict
 import datetime
 
 # Create admin blueprint
@@ -61,6 +67,7 @@ def admin_context():
 @admin.route("/")
 @login_required
 @admin_required
+@read_replica
 def dashboard():
     """Admin dashboard homepage."""
     # Get basic statistics for the dashboard
@@ -70,7 +77,7 @@ def dashboard():
     total_users = User.query.count()
 
     # Get recent parking activity (last 10 bookings)
-    recent_bookings = Booking.query.order_by(Booking.created_at.desc()).filter(Booking.payment_status == "paid").limit(10).all()
+    recent_bookings = Booking.get_paid_bookings(limit=10)
 
     return render_template(
         "admin/index.html",
@@ -82,9 +89,38 @@ def dashboard():
     )
 
 
+@admin.route("/slow-queries")
+@login_required
+@admin_required
+def slow_queries():
+    """Admin view of the most recent slow database queries."""
+    from app.utils import slow_queries as slow_query_module
+
+    log = slow_query_module.slow_query_log
+    entries = log.recent() if log else []
+    threshold = log.threshold * 1000 if log else None
+    return render_template(
+        "admin/slow_queries.html", entries=entries, threshold=threshold
+    )
+
+
+@admin.route("/slow-queries/clear", methods=["POST"])
+@login_required
+@admin_required
+def clear_slow_queries():
+    """Empty the slow query buffer."""
+    from app.utils import slow_queries as slow_query_module
+
+    if slow_query_module.slow_query_log:
+        slow_query_module.slow_query_log.clear()
+    flash("Slow query log cleared.", "success")
+    return redirect(url_for("admin.slow_queries"))
+
+
 @admin.route("/parking-slots")
 @login_required
 @admin_required
+@read_replica
 def parking_slots():
     """Admin view for managing parking slots."""
     slots = ParkingSlot.query.all()
@@ -113,6 +149,10 @@ def delete_parking_slot(slot_id):
         )
 
     try:
+        # Drafts that picked this slot have to pick another one
+        BookingDraft.query.filter_by(parking_slot_id=slot_id).update(
+            {"parking_slot_id": None}, synchronize_session=False
+        )
         db.session.delete(slot)
         db.session.commit()
         return jsonify(
@@ -126,6 +166,7 @@ def delete_parking_slot(slot_id):
 @admin.route("/users")
 @login_required
 @admin_required
+@read_replica
 def users():
     """Admin view for managing users."""
     users = User.query.all()
@@ -147,12 +188,26 @@ def delete_user(user_id):
         )
 
     try:
-        # Delete all bookings associated with this user
+        # Delete all bookings associated with this user; a bulk delete skips
+        # mapper events, so update the gate indexes explicitly
+        deleted_bookings = Booking.query.with_entities(
+            Booking.id, Booking.booking_date
+        ).filter_by(user_id=user_id).all()
+        booking_ids = [row.id for row in deleted_bookings]
+        GateEvent.query.filter(GateEvent.booking_id.in_(booking_ids)).delete(
+            synchronize_session=False
+        )
         Booking.query.filter_by(user_id=user_id).delete()
+        record_deleted_bookings(db.session.connection(), deleted_bookings)
+
+        BookingDraft.query.filter_by(user_id=user_id).delete()
 
         # Delete the user
         db.session.delete(user)
         db.session.commit()
+        for booking_id in booking_ids:
+            revoked_tickets.add(booking_id)
+            active_plates.discard(booking_id)
         return jsonify({"success": True, "message": "User deleted successfully"})
     except Exception as e:
         db.session.rollback()
@@ -162,6 +217,7 @@ def delete_user(user_id):
 @admin.route("/bookings")
 @login_required
 @admin_required
+@read_replica
 def bookings():
     """Admin view for all bookings."""
     bookings = Booking.query.order_by(Booking.created_at.desc()).all()
@@ -175,7 +231,7 @@ def delete_booking(booking_id):
     """Delete a booking."""
     booking = Booking.query.get_or_404(booking_id)
 
-    try:
+    def release_and_delete():
         # If the booking has a slot and it's reserved, release it
         if booking.parking_slot_id and booking.booking_status in [
             "confirmed",
@@ -189,17 +245,55 @@ def delete_booking(booking_id):
                 # Update available slots count in the parking location
                 location = ParkingLocation.query.get(booking.parking_location_id)
 
-        # Delete the booking
+        # Gate events reference the booking, so they go with it
+        GateEvent.query.filter_by(booking_id=booking.id).delete()
         db.session.delete(booking)
-        db.session.commit()
+
+    try:
+        # Re-reads the booking and slot if they changed while we were deciding
+        retry_on_conflict(release_and_delete)
         return jsonify({"success": True, "message": "Booking deleted successfully"})
     except Exception as e:
         db.session.rollback()
         return jsonify({"success": False, "message": str(e)}), 500
 
+@admin.route("/tickets/export")
+@login_required
+@admin_required
+@read_replica
+def export_tickets():
+    """
+    Bulk ticket export for attendants and events.
+    Optional filters: booking_ids (comma separated), location_id, date
+    (YYYY-MM-DD); format is zip (default) or pdf.
+    """
+    from app.parking.tickets import export_tickets_response
+
+    query = Booking.query.filter(Booking.booking_status == "confirmed")
+
+    try:
+        if request.args.get("booking_ids"):
+            ids = [int(i) for i in request.args["booking_ids"].split(",") if i.strip()]
+            query = query.filter(Booking.id.in_(ids))
+        if request.args.get("location_id"):
+            query = query.filter(
+                Booking.parking_location_id == int(request.args["location_id"])
+            )
+        if request.args.get("date"):
+            booking_date = datetime.datetime.strptime(
+                request.args["date"], "%Y-%m-%d"
+            ).date()
+            query = query.filter(Booking.booking_date == booking_date)
+    except ValueError:
+        return jsonify({"success": False, "message": "Invalid export filters"}), 400
+
+    return export_tickets_response(query, request.args.get("format", "zip"))
+
+
 @admin.route("/booking-history")
 @login_required
 @admin_required
+@read_replica
 def booking_history():
     """Admin view for booking history."""
     completed_bookings = (
@@ -213,6 +307,7 @@ def booking_history():
 @admin.route("/vehicles")
 @login_required
 @admin_required
+@read_replica
 def vehicles():
     """Admin view for managing vehicles."""
     # Join user and vehicle data
@@ -223,11 +318,8 @@ def vehicles():
 @admin.route("/payments")
 @login_required
 @admin_required
+@read_replica
 def payments():
     """Admin view for payment transactions."""
-    bookings = (
-        Booking.query.filter(Booking.payment_status == "paid")
-        .order_by(Booking.created_at.desc())
-        .all()
-    )
+    bookings = Booking.get_paid_bookings()
     return render_template("admin/payments.html", bookings=bookings)
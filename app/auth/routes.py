@@ -38,22 +38,31 @@ def register():
                 raise ValueError("Failed to generate verification token")
 
             db.session.add(user)
-            db.session.commit()
+            # The queued verification email refers to the user's id
+            db.session.flush()
 
+            # Queued in the same transaction as the user; a failure only
+            # rolls back the email
+            email_queued = True
             try:
-                send_verification_email(user, token)
+                with db.session.begin_nested():
+                    send_verification_email(user, token)
+            except Exception as e:
+                current_app.logger.error(f"Email sending failed: {str(e)}")
+                email_queued = False
+            db.session.commit()
+
+            if email_queued:
                 flash(
                     "Registration successful!",
                     "success",
                 )
-                return redirect(url_for("auth.login"))
-            except Exception as e:
-                current_app.logger.error(f"Email sending failed: {str(e)}")
+            else:
                 flash(
                     "Registration successful.",
                     "warning",
                 )
-                return redirect(url_for("auth.login"))
+            return redirect(url_for("auth.login"))
 
         except IntegrityError:
             db.session.rollback()
@@ -117,6 +126,12 @@ def login():
             return render_template("auth/login.html", form=form)
 
         user.track_login_attempt(successful=True)
+
+        # Upgrade the stored hash while we have the plain password
+        if user.password_needs_rehash():
+            user.set_password(form.password.data)
+            db.session.commit()
+
         login_user(user, remember=form.remember_me.data)
 
         next_page = request.args.get("next")
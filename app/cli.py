@@ -0,0 +1,113 @@
+import os
+
+import click
+from flask import current_app
+
+from app.extensions import db
+
+
+def register_commands(app):
+    """
+    One-off setup commands, plus ``serve`` for running in production. The setup
+    commands used to run inside ``create_app`` on every worker start; run them
+    once per deploy instead, e.g. ``flask init-db && flask ensure-admin && flask seed``.
+    """
+
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Create database tables that do not exist yet."""
+        db.create_all()
+        click.echo("Database tables created")
+
+    @app.cli.command("ensure-admin")
+    def ensure_admin_command():
+        """Create the admin user, or update its password from ADMIN_PASSWORD."""
+        from app.models.user import User
+
+        admin_email = current_app.config.get("ADMIN_EMAIL") or "admin@example.com"
+        admin_password = current_app.config.get("ADMIN_PASSWORD")
+        if not admin_password:
+            raise click.ClickException("ADMIN_PASSWORD is not set")
+
+        admin_user = User.query.filter_by(email=admin_email).first()
+        if not admin_user:
+            admin = User(
+                email=admin_email,
+                username="admin",
+                is_admin=True,
+                first_name="Admin",
+                last_name="User",
+            )
+            admin.set_password(admin_password)
+            db.session.add(admin)
+            db.session.commit()
+            click.echo("Created default admin user")
+        elif (
+            not admin_user.check_password(admin_password)
+            or admin_user.password_needs_rehash()
+        ):
+            admin_user.set_password(admin_password)
+            db.session.commit()
+            click.echo("Updated admin password")
+        else:
+            click.echo("Admin user is up to date")
+
+    @app.cli.command("seed")
+    def seed_command():
+        """Seed parking locations and slots if there are none."""
+        from app.parking.routes import seed_parking_locations, seed_parking_slots
+
+        try:
+            seed_parking_locations()
+            seed_parking_slots()
+        except Exception as e:
+            raise click.ClickException(f"Seeding failed: {e}")
+        click.echo("Seeded parking data")
+
+    @app.cli.command("serve")
+    @click.option("--bind", default=None, help="Address to listen on (SERVE_BIND).")
+    @click.option("--workers", type=int, default=None, help="Worker processes (SERVE_WORKERS).")
+    @click.option("--threads", type=int, default=None, help="Threads per worker (SERVE_THREADS).")
+    @click.option("--debug", is_flag=True, help="Enable debug mode and template auto-reload.")
+    @click.option(
+        "--no-email-sender",
+        is_flag=True,
+        help="Do not start the outbox email sender (SERVE_EMAIL_SENDER).",
+    )
+    def serve_command(bind, workers, threads, debug, no_email_sender):
+        """
+        Run the app under gunicorn, preloaded and warmed up before forking.
+        With the outbox email backend, ``flask send-emails`` runs alongside it.
+        """
+        from app.utils.serving import GunicornServer, start_email_sender, warm_up
+
+        app = current_app._get_current_object()
+        app.debug = debug
+        app.config["TEMPLATES_AUTO_RELOAD"] = debug or app.config["TEMPLATES_AUTO_RELOAD"]
+        app.jinja_env.auto_reload = app.config["TEMPLATES_AUTO_RELOAD"]
+        click.echo(f"Warmed up {warm_up(app)} templates")
+
+        config = app.config
+        workers = workers or config["SERVE_WORKERS"] or 2 * (os.cpu_count() or 1) + 1
+        email_sender = None
+        if (
+            config.get("EMAIL_BACKEND") == "outbox"
+            and config.get("SERVE_EMAIL_SENDER", True)
+            and not no_email_sender
+        ):
+            email_sender = start_email_sender()
+            click.echo(f"Started outbox email sender (pid {email_sender.pid})")
+        try:
+            GunicornServer(
+                app,
+                {
+                    "bind": bind or config["SERVE_BIND"],
+                    "workers": workers,
+                    "threads": threads or config["SERVE_THREADS"],
+                    "timeout": config["SERVE_TIMEOUT"],
+                    "accesslog": "-",
+                },
+            ).run()
+        finally:
+            if email_sender is not None:
+                email_sender.terminate()
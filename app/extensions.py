@@ -9,8 +9,10 @@ from flask_mail import Mail
 from flask_cors import CORS
 from flask_wtf.csrf import CSRFProtect
 
+from app.utils.db_routing import RoutingSession
+
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 mail = Mail()
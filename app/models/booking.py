@@ -1,10 +1,34 @@
+import re
 from datetime import datetime
 from app import db
 from flask_login import current_user
+from sqlalchemy import select
+from sqlalchemy.orm import Session, validates
+from app.utils.metrics import EXPIRY_JOB_DURATION
+from app.utils.unit_of_work import retry_on_conflict
+
+
+def normalize_plate(vehicle_number):
+    """Uppercase a registration number and strip spaces and separators."""
+    return re.sub(r"[^A-Z0-9]", "", (vehicle_number or "").upper())
+
+
+def booking_price(hourly_rate, duration_hours, vehicle_type=None):
+    """Price rounded to whole rupees; two-wheelers get 50% off."""
+    price = round(duration_hours * hourly_rate)
+    if vehicle_type == "two-wheeler":
+        price = round(price * 0.5)
+    return price
 
 
 class Booking(db.Model):
     __tablename__ = "bookings"
+    __table_args__ = (
+        db.Index("ix_bookings_user_created", "user_id", "created_at"),
+        db.Index("ix_bookings_status_slot", "booking_status", "parking_slot_id"),
+        db.Index("ix_bookings_payment_created", "payment_status", "created_at"),
+        db.Index("ix_bookings_plate_date", "vehicle_plate", "booking_date"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -15,6 +39,8 @@ class Booking(db.Model):
         db.Integer, db.ForeignKey("parking_slots.id"), nullable=True
     )  # Can be null initially until slot is selected
     vehicle_number = db.Column(db.String(20), nullable=False)
+    # Normalized form of vehicle_number (see normalize_plate), kept in sync on assignment
+    vehicle_plate = db.Column(db.String(20), nullable=False)
     vehicle_type = db.Column(
         db.String(20), nullable=True
     )  # Can be null initially until slot is selected
@@ -30,6 +56,14 @@ class Booking(db.Model):
     updated_at = db.Column(
         db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
     )
+    # Optimistic locking: UPDATEs/DELETEs of a row changed since it was loaded
+    # fail with StaleDataError (see app.utils.unit_of_work.retry_on_conflict)
+    version_id = db.Column(db.Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version_id}
+    # Version of the signed ticket: only bumped when a field the ticket token
+    # carries changes (see app.parking.gate), so older tickets are superseded
+    ticket_version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
 
     # Define relationships
     user = db.relationship("User", backref="bookings")
@@ -39,6 +73,11 @@ class Booking(db.Model):
     def __repr__(self):
         return f"<Booking #{self.id} for User #{self.user_id} at Location #{self.parking_location_id}>"
 
+    @validates("vehicle_number")
+    def _sync_vehicle_plate(self, key, vehicle_number):
+        self.vehicle_plate = normalize_plate(vehicle_number)
+        return vehicle_number
+
     @classmethod
     def get_by_id(cls, booking_id):
         """Get a booking by ID."""
@@ -51,31 +90,57 @@ class Booking(db.Model):
             cls.query.filter_by(user_id=user_id).order_by(cls.created_at.desc()).all()
         )
 
+    @classmethod
+    def get_paid_bookings(cls, limit=None):
+        """Get paid bookings, newest first."""
+        query = cls.query.filter(cls.payment_status == "paid").order_by(
+            cls.created_at.desc()
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
     @classmethod
     def create_booking(cls, **kwargs):
-        """Create a new booking"""
+        """Create a new booking (flushed for its id, committed by the caller)."""
         booking = cls(user_id=current_user.id, **kwargs)
         booking.booking_status = "pending"
         booking.payment_status = "pending"
         db.session.add(booking)
-        db.session.commit()
+        db.session.flush()
         return booking
 
     @classmethod
     def release_expired_slots(cls):
-        """Release slots for bookings that have ended"""
+        """
+        Release slots for bookings that have ended.
+
+        A job of its own: it runs in a separate session and transaction on the
+        primary, so views calling it neither commit nor roll back their own
+        unit of work with it. A booking or slot changed concurrently makes the
+        commit fail on its version and the job starts over.
+        """
+        # autoflush off: every change stays pending (and visible to
+        # retry_on_conflict) until the commit
+        with EXPIRY_JOB_DURATION.time(), Session(db.engine, autoflush=False) as session:
+            return retry_on_conflict(
+                lambda: cls._release_expired_slots(session), session=session
+            )
+
+    @classmethod
+    def _release_expired_slots(cls, session):
         now = datetime.now()
 
         from app.models.parking_slot import ParkingSlot
-        from app.models.parking_location import ParkingLocation
 
         # Get all confirmed bookings with reserved slots
-        expired_bookings = cls.query.filter(
-            cls.booking_status == "confirmed", cls.parking_slot_id.isnot(None)
+        expired_bookings = session.scalars(
+            select(cls).where(
+                cls.booking_status == "confirmed", cls.parking_slot_id.isnot(None)
+            )
         ).all()
 
         released_count = 0
-        updated_location_ids = set()
 
         for booking in expired_bookings:
             booking_end = datetime.combine(booking.booking_date, booking.end_time)
@@ -84,25 +149,13 @@ class Booking(db.Model):
                 booking.booking_status = "completed"
 
                 # Free the parking slot
-                slot = ParkingSlot.query.get(booking.parking_slot_id)
+                slot = session.get(ParkingSlot, booking.parking_slot_id)
                 if slot and not slot.is_available:
                     slot.is_available = True
                     slot.is_reserved = False
-                    db.session.add(slot)
 
-                # Track affected locations to recalculate availability
-                updated_location_ids.add(booking.parking_location_id)
                 released_count += 1
 
-                db.session.add(booking)
-
-        # Update availability count per location
-        for location_id in updated_location_ids:
-            location = ParkingLocation.query.get(location_id)
-
-        if released_count > 0:
-            db.session.commit()
-
         return released_count
 
     def update_slot_details(self, slot_id, vehicle_type):
@@ -120,7 +173,6 @@ class Booking(db.Model):
 
         location = ParkingLocation.query.get(self.parking_location_id)
 
-        db.session.commit()
         return self
 
     def update_payment_details(self, payment_method, payment_status):
@@ -134,13 +186,11 @@ class Booking(db.Model):
             self.payment_status = payment_status
 
         self.booking_status = "confirmed"
-        db.session.commit()
         return self
 
     def cancel_booking(self):
         """Cancel a booking."""
         self.booking_status = "cancelled"
-        db.session.commit()
         return self
 
     def to_dict(self):
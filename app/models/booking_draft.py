@@ -0,0 +1,78 @@
+from datetime import datetime
+from app import db
+from app.models.booking import Booking, booking_price
+
+
+class BookingDraft(db.Model):
+    """
+    A booking that has not been paid for yet: the details and slot a user
+    picked. Kept out of the bookings table until payment is confirmed, then
+    deleted in the same transaction that inserts the Booking.
+    """
+
+    __tablename__ = "booking_drafts"
+
+    # Never all digits, so a draft id cannot be taken for a booking id
+    ID_PREFIX = "draft-"
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    parking_location_id = db.Column(
+        db.Integer, db.ForeignKey("parking_locations.id"), nullable=False
+    )
+    parking_slot_id = db.Column(db.Integer, db.ForeignKey("parking_slots.id"), nullable=True)
+    vehicle_number = db.Column(db.String(20), nullable=False)
+    vehicle_type = db.Column(db.String(20), nullable=True)
+    booking_date = db.Column(db.Date, nullable=False)
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    duration_hours = db.Column(db.Float, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    parking_location = db.relationship("ParkingLocation")
+
+    # Shaped like a Booking for the templates
+    payment_status = "pending"
+    booking_status = "pending"
+    payment_method = None
+
+    def __repr__(self):
+        return f"<BookingDraft {self.id} for User #{self.user_id} at Location #{self.parking_location_id}>"
+
+    @property
+    def total_price(self):
+        """Price from the location's current rate; never stored with the draft."""
+        return booking_price(
+            self.parking_location.hourly_rate, self.duration_hours, self.vehicle_type
+        )
+
+    def update_details(self, booking_date, start_time, end_time, duration_hours, vehicle_number):
+        """Set date, time and vehicle; the slot has to be selected again."""
+        self.booking_date = booking_date
+        self.start_time = start_time
+        self.end_time = end_time
+        self.duration_hours = duration_hours
+        self.vehicle_number = vehicle_number
+        self.parking_slot_id = None
+        self.vehicle_type = None
+
+    def update_slot_details(self, slot_id, vehicle_type):
+        """Set the selected slot and vehicle type."""
+        self.parking_slot_id = int(slot_id)
+        self.vehicle_type = vehicle_type
+
+    def to_booking(self):
+        """Build the (not yet added) Booking row for this draft, priced now."""
+        return Booking(
+            user_id=self.user_id,
+            parking_location_id=self.parking_location_id,
+            parking_slot_id=self.parking_slot_id,
+            vehicle_number=self.vehicle_number,
+            vehicle_type=self.vehicle_type,
+            booking_date=self.booking_date,
+            start_time=self.start_time,
+            end_time=self.end_time,
+            duration_hours=self.duration_hours,
+            total_price=self.total_price,
+        )
@@ -0,0 +1,38 @@
+from datetime import datetime
+from app import db
+
+
+class EmailOutbox(db.Model):
+    """
+    Email waiting to be sent by the outbox sender (``flask send-emails``).
+
+    Either ``template`` (rendered by the sender with ``context``) or the
+    pre-rendered ``text_body``/``html_body`` is set.
+    """
+
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        db.Index("ix_email_outbox_status_available", "status", "available_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipients = db.Column(db.JSON, nullable=False)
+    sender = db.Column(db.String(120), nullable=True)
+    subject = db.Column(db.String(255), nullable=False)
+    template = db.Column(db.String(100), nullable=True)
+    context = db.Column(db.JSON, nullable=True)
+    text_body = db.Column(db.Text, nullable=True)
+    html_body = db.Column(db.Text, nullable=True)
+    status = db.Column(
+        db.String(20), default="pending", nullable=False
+    )  # pending, sending, sent or failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    claimed_by = db.Column(db.String(64), nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<EmailOutbox #{self.id} {self.status} to {self.recipients}>"
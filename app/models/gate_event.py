@@ -0,0 +1,38 @@
+from datetime import datetime
+from app import db
+
+
+class GateEvent(db.Model):
+    """Entry/exit event reported by a boom barrier for a booking."""
+
+    __tablename__ = "gate_events"
+    __table_args__ = (
+        db.Index("ix_gate_events_booking_occurred", "booking_id", "occurred_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Client-generated id; the unique constraint makes ingestion idempotent
+    event_id = db.Column(db.String(64), unique=True, nullable=False)
+    booking_id = db.Column(db.Integer, db.ForeignKey("bookings.id"), nullable=False)
+    parking_location_id = db.Column(
+        db.Integer, db.ForeignKey("parking_locations.id"), nullable=False
+    )
+    event_type = db.Column(db.String(10), nullable=False)  # "entry" or "exit"
+    gate_id = db.Column(db.String(50), nullable=True)
+    occurred_at = db.Column(db.DateTime, nullable=False)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    EVENT_TYPES = ("entry", "exit")
+
+    def __repr__(self):
+        return f"<GateEvent {self.event_id} {self.event_type} for Booking #{self.booking_id}>"
+
+    def to_dict(self):
+        return {
+            "event_id": self.event_id,
+            "booking_id": self.booking_id,
+            "parking_location_id": self.parking_location_id,
+            "event_type": self.event_type,
+            "gate_id": self.gate_id,
+            "occurred_at": self.occurred_at.strftime("%Y-%m-%d %H:%M:%S"),
+        }
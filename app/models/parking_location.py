@@ -50,10 +50,7 @@ class ParkingLocation(db.Model):
     def to_dict(self):
         from app.models.parking_slot import ParkingSlot  
 
-        live_available_slots = ParkingSlot.query.filter_by(
-            parking_location_id=self.id,
-            is_available=True
-        ).count()
+        live_available_slots = ParkingSlot.count_available(self.id)
 
         return {
             "id": self.id,
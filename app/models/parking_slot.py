@@ -4,6 +4,15 @@ from app import db
 
 class ParkingSlot(db.Model):
     __tablename__ = "parking_slots"
+    __table_args__ = (
+        # Covers get_available_slots and the per-location availability counts
+        db.Index(
+            "ix_parking_slots_location_type_available",
+            "parking_location_id",
+            "vehicle_type",
+            "is_available",
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     parking_location_id = db.Column(
@@ -20,6 +29,10 @@ class ParkingSlot(db.Model):
     updated_at = db.Column(
         db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
     )
+    # Optimistic locking, as on Booking
+    version_id = db.Column(db.Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version_id}
 
     # Define relationship with ParkingLocation
     parking_location = db.relationship("ParkingLocation", backref="slots")
@@ -36,6 +49,13 @@ class ParkingSlot(db.Model):
             is_available=True,
         ).all()
 
+    @classmethod
+    def count_available(cls, parking_location_id):
+        """Count the free slots of a location, of any vehicle type."""
+        return cls.query.filter_by(
+            parking_location_id=parking_location_id, is_available=True
+        ).count()
+
     @classmethod
     def get_all_slots(cls, parking_location_id, vehicle_type):
         """Get all parking slots by location and vehicle type, both available and unavailable."""
@@ -56,7 +76,6 @@ class ParkingSlot(db.Model):
         if slot and slot.is_available:
             slot.is_available = False
             slot.is_reserved = True
-            db.session.commit()
             return True
         return False
 
@@ -67,7 +86,6 @@ class ParkingSlot(db.Model):
         if slot and not slot.is_available:
             slot.is_available = True
             slot.is_reserved = False
-            db.session.commit()
             return True
         return False
 
@@ -0,0 +1,17 @@
+from datetime import datetime
+from app import db
+
+
+class TicketRevocation(db.Model):
+    """Tombstone for a deleted booking, so every worker stops accepting its ticket."""
+
+    __tablename__ = "ticket_revocations"
+
+    # No foreign key: the booking row is gone
+    booking_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # Date of the deleted booking; tombstones only matter while its ticket could be valid
+    booking_date = db.Column(db.Date, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TicketRevocation for Booking #{self.booking_id}>"
@@ -1,8 +1,13 @@
 from datetime import datetime
+import threading
+import time
 import uuid
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event
 from app import db, login_manager
+from app.utils.login_attempts import login_attempts
+from app.utils.metrics import record_cache
+from app.utils.passwords import password_hasher
 
 class User(db.Model, UserMixin):
     __tablename__ = 'users'
@@ -19,8 +24,8 @@ class User(db.Model, UserMixin):
     is_admin = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
     email_verified = db.Column(db.Boolean, default=False)
-    verification_token = db.Column(db.String(100))
-    reset_password_token = db.Column(db.String(100))
+    verification_token = db.Column(db.String(100), index=True)
+    reset_password_token = db.Column(db.String(100), index=True)
     reset_token_expiry = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -35,11 +40,15 @@ class User(db.Model, UserMixin):
     
     def set_password(self, password):
         """Set password hash for the user."""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
         """Check if the provided password is correct."""
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """Check if the password hash was made with outdated cost parameters."""
+        return password_hasher.needs_rehash(self.password_hash)
     
     def get_full_name(self):
         """Get the user's full name."""
@@ -89,32 +98,16 @@ class User(db.Model, UserMixin):
         self.login_attempts = 0
         self.locked_until = None
         db.session.commit()
+        login_attempts.forget(self.id)
         return True
     
     def track_login_attempt(self, successful):
-        """Track login attempts and handle account locking."""
-        if successful:
-            self.login_attempts = 0
-            self.locked_until = None
-            self.last_login = datetime.utcnow()
-        else:
-            self.login_attempts += 1
-            if self.login_attempts >= 5:
-                from datetime import timedelta
-                self.locked_until = datetime.utcnow() + timedelta(minutes=30)
-        db.session.commit()
+        """Track login attempts and handle account locking (written to the DB in batches)."""
+        login_attempts.record(self, successful)
     
     def is_account_locked(self):
         """Check if the account is currently locked."""
-        if not self.locked_until:
-            return False
-        if self.locked_until > datetime.utcnow():
-            return True
-        # Reset if lock has expired
-        self.locked_until = None
-        self.login_attempts = 0
-        db.session.commit()
-        return False
+        return login_attempts.is_locked(self)
     
     @classmethod
     def get_by_email(cls, email):
@@ -142,7 +135,105 @@ class User(db.Model, UserMixin):
         user = cls.query.filter_by(verification_token=token).first()
         return user
 
+class CachedUser(UserMixin):
+    """
+    Stand-in for the logged-in User built from cached session fields.
+
+    Reading a cached field needs no query. Anything else (relationships,
+    password methods) and every attribute write loads the real User row on
+    first use and delegates to it, so views can keep modifying current_user
+    and committing as before.
+    """
+
+    def __init__(self, fields):
+        object.__setattr__(self, "_fields", fields)
+        object.__setattr__(self, "_user", None)
+
+    def _load(self):
+        if self._user is None:
+            object.__setattr__(self, "_user", db.session.get(User, self._fields["id"]))
+        return self._user
+
+    def __getattr__(self, name):
+        fields = object.__getattribute__(self, "_fields")
+        if name in fields:
+            return fields[name]
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+        if name in self._fields:
+            self._fields[name] = value
+
+    @property
+    def is_active(self):
+        return self._fields["is_active"]
+
+    def get_full_name(self):
+        return User.get_full_name(self)
+
+    def __repr__(self):
+        return f'<User {self.username} (cached)>'
+
+
+class UserCache:
+    """
+    Per-process cache of the session-relevant fields of logged-in users.
+
+    Entries live for ``ttl`` seconds. Any change to a User row made through
+    the ORM in this process (profile update, password change, lockout,
+    deletion) drops its entry immediately; other processes see the change once
+    their entry expires.
+    """
+
+    FIELDS = (
+        'id', 'uuid', 'email', 'username', 'first_name', 'last_name', 'phone_number',
+        'profile_image', 'is_admin', 'is_active', 'email_verified', 'created_at',
+    )
+
+    def __init__(self):
+        self.ttl = 30
+        self.max_entries = 10000
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('USER_CACHE_TTL_SECONDS', 30)
+        self.max_entries = app.config.get('USER_CACHE_MAX_ENTRIES', 10000)
+
+    def get(self, user_id):
+        """Return a CachedUser on a hit, otherwise load (and cache) the User."""
+        entry = self._entries.get(user_id)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            record_cache('user', True)
+            return CachedUser(dict(entry[1]))
+
+        record_cache('user', False)
+        user = db.session.get(User, user_id)
+        if user is not None and self.ttl > 0:
+            fields = {field: getattr(user, field) for field in self.FIELDS}
+            with self._lock:
+                if len(self._entries) >= self.max_entries:
+                    # Dicts keep insertion order, so this drops the oldest entry
+                    self._entries.pop(next(iter(self._entries)), None)
+                self._entries[user_id] = (time.monotonic(), fields)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, user):
+    user_cache.invalidate(user.id)
+
+
 @login_manager.user_loader
 def load_user(id):
     """Load a user by ID for Flask-Login."""
-    return User.query.get(int(id))
+    return user_cache.get(int(id))
@@ -0,0 +1,71 @@
+"""
+Booking drafts: the details and slot a user picks before paying. They are
+rows in the ``booking_drafts`` table with a TTL instead of ``pending`` rows
+in the bookings table, and become a Booking only when the payment is
+confirmed.
+"""
+import secrets
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models.booking_draft import BookingDraft
+
+
+class BookingDraftStore:
+    """
+    Drafts kept server-side in the ``booking_drafts`` table, changed in the
+    caller's unit of work.
+
+    Each draft expires ``ttl`` seconds after it was last saved, and a user
+    keeps at most ``max_drafts`` of them (the oldest is dropped). Expired
+    drafts are deleted whenever a new one is started.
+    """
+
+    def __init__(self):
+        self.ttl = 1800
+        self.max_drafts = 5
+
+    def init_app(self, app):
+        self.ttl = app.config.get("BOOKING_DRAFT_TTL_SECONDS", 1800)
+        self.max_drafts = app.config.get("BOOKING_DRAFT_MAX", 5)
+
+    def create(self, user_id, parking_location_id):
+        """Start an empty draft for a location; fill it and ``save`` it."""
+        BookingDraft.query.filter(BookingDraft.expires_at <= datetime.utcnow()).delete(
+            synchronize_session=False
+        )
+        return BookingDraft(
+            id=BookingDraft.ID_PREFIX + secrets.token_hex(8),
+            user_id=user_id,
+            parking_location_id=parking_location_id,
+        )
+
+    def get(self, draft_id, user_id):
+        """Return the user's draft, or None if it is unknown or expired."""
+        if not (draft_id or "").startswith(BookingDraft.ID_PREFIX):
+            return None
+        draft = db.session.get(BookingDraft, draft_id)
+        if draft is None or draft.user_id != user_id or draft.expires_at <= datetime.utcnow():
+            return None
+        return draft
+
+    def save(self, draft):
+        """Store the draft and restart its TTL."""
+        draft.expires_at = datetime.utcnow() + timedelta(seconds=self.ttl)
+        db.session.add(draft)
+        older = (
+            BookingDraft.query.filter(
+                BookingDraft.user_id == draft.user_id, BookingDraft.id != draft.id
+            )
+            .order_by(BookingDraft.expires_at.desc())
+            .offset(self.max_drafts - 1)
+            .all()
+        )
+        for old in older:
+            db.session.delete(old)
+
+    def discard(self, draft):
+        db.session.delete(draft)
+
+
+booking_drafts = BookingDraftStore()
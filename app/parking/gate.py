@@ -0,0 +1,425 @@
+"""
+Gate-side ticket validation.
+Ticket QR codes carry a compact HMAC-signed token, so a gate can check a ticket
+without a database round trip; only revoked (cancelled, deleted or edited)
+bookings need the database, and those are kept in a small in-memory set.
+Barrier entry/exit events are ingested in batches with bulk inserts.
+"""
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from datetime import date, datetime, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, request
+from flask_login import current_user
+from sqlalchemy import event, insert, inspect, or_
+
+from app.extensions import db
+from app.models.booking import Booking
+from app.models.gate_event import GateEvent
+from app.models.ticket_revocation import TicketRevocation
+from app.utils.unit_of_work import on_commit
+
+TOKEN_VERSION = "2"
+SIGNATURE_BYTES = 16
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class TicketSigner:
+    """
+    Signs and verifies ticket tokens of the form ``2.<payload>.<signature>``
+    (``TOKEN_VERSION``, then the payload and signature, base64url-encoded).
+
+    The payload is ``booking_id|version|slot|vehicle|valid_from|valid_until``
+    (``version`` is the booking's ``ticket_version``, times in epoch seconds)
+    and the signature a truncated HMAC-SHA256 over it.
+    """
+
+    def __init__(self):
+        self.key = None
+        self.grace = timedelta(minutes=15)
+
+    def init_app(self, app):
+        secret = app.config.get("TICKET_SIGNING_KEY") or app.config["SECRET_KEY"]
+        self.configure(secret, app.config.get("GATE_GRACE_MINUTES", 15))
+
+    def configure(self, secret, grace_minutes=15):
+        # Derive a dedicated key so tokens can't be confused with session cookies
+        self.key = hmac.new(
+            secret.encode("utf-8"), b"parking-ticket-token", hashlib.sha256
+        ).digest()
+        self.grace = timedelta(minutes=grace_minutes)
+
+    @property
+    def key_id(self):
+        """Short fingerprint of the key, so rotating it changes cached tickets."""
+        return hashlib.sha256(self.key).hexdigest()[:8] if self.key else None
+
+    def _signature(self, payload):
+        return hmac.new(self.key, payload, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+    def validity_window(self, booking):
+        """Epoch seconds between which the ticket opens the gate."""
+        start = datetime.combine(booking.booking_date, booking.start_time) - self.grace
+        end = datetime.combine(booking.booking_date, booking.end_time) + self.grace
+        return int(start.timestamp()), int(end.timestamp())
+
+    def sign(self, booking, parking_slot):
+        """Return the signed token for a booking's ticket."""
+        valid_from, valid_until = self.validity_window(booking)
+        payload = "|".join(
+            str(value)
+            for value in (
+                booking.id,
+                booking.ticket_version,
+                parking_slot.slot_number,
+                booking.vehicle_number,
+                valid_from,
+                valid_until,
+            )
+        ).encode("utf-8")
+        return ".".join(
+            (TOKEN_VERSION, _b64encode(payload), _b64encode(self._signature(payload)))
+        )
+
+    def verify(self, token, now=None):
+        """
+        Check a token's signature and validity window.
+
+        Returns ``(claims, None)`` for a good token and ``(None, reason)``
+        otherwise. Revocation is checked separately.
+        """
+        try:
+            version, payload_text, signature_text = token.split(".")
+            payload = _b64decode(payload_text)
+            signature = _b64decode(signature_text)
+        except (ValueError, AttributeError):
+            return None, "malformed"
+        if version != TOKEN_VERSION:
+            return None, "unsupported_version"
+        if not hmac.compare_digest(signature, self._signature(payload)):
+            return None, "bad_signature"
+
+        try:
+            booking_id, version, slot_number, vehicle_number, valid_from, valid_until = (
+                payload.decode("utf-8").split("|")
+            )
+            claims = {
+                "booking_id": int(booking_id),
+                "version": int(version),
+                "slot_number": slot_number,
+                "vehicle_number": vehicle_number,
+                "valid_from": int(valid_from),
+                "valid_until": int(valid_until),
+            }
+        except ValueError:
+            return None, "malformed"
+
+        now = time.time() if now is None else now
+        if now < claims["valid_from"]:
+            return None, "not_yet_valid"
+        if now > claims["valid_until"]:
+            return None, "expired"
+        return claims, None
+
+
+class RevocationSet:
+    """
+    Booking ids whose tickets must no longer open the gate.
+
+    A ticket is revoked when its booking was cancelled or deleted, or when it
+    was signed for an older version of a booking that has since been edited.
+    The set is reloaded from the database every ``refresh_seconds`` (cancelled
+    and edited bookings, and ``ticket_revocations`` tombstones of deleted
+    ones), so changes made by other workers are picked up too. Changes
+    committed by this worker apply at once and are kept until a reload has
+    seen them.
+    """
+
+    def __init__(self, refresh_seconds=60):
+        self.refresh_seconds = refresh_seconds
+        self._ids = frozenset()
+        self._versions = {}
+        # booking id -> (monotonic time added, version or None for revoked)
+        self._local = {}
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.refresh_seconds = app.config.get("GATE_REVOCATION_REFRESH_SECONDS", 60)
+
+    def add(self, booking_id):
+        """Revoke every ticket of a cancelled or deleted booking."""
+        with self._lock:
+            self._local[booking_id] = (time.monotonic(), None)
+            self._ids = self._ids | {booking_id}
+
+    def supersede(self, booking_id, version):
+        """Revoke tickets signed for versions of the booking before ``version``."""
+        with self._lock:
+            added, current = self._local.get(booking_id, (0, 0))
+            if current is not None:
+                self._local[booking_id] = (time.monotonic(), max(current, version))
+            if self._versions.get(booking_id, 0) < version:
+                self._versions = {**self._versions, booking_id: version}
+
+    def refresh(self):
+        started = time.monotonic()
+        yesterday = date.today() - timedelta(days=1)
+        rows = (
+            db.session.query(Booking.id, Booking.ticket_version, Booking.booking_status)
+            .filter(
+                Booking.booking_date >= yesterday,
+                or_(Booking.booking_status == "cancelled", Booking.ticket_version > 1),
+            )
+            .all()
+        )
+        deleted = db.session.query(TicketRevocation.booking_id).filter(
+            TicketRevocation.booking_date >= yesterday
+        )
+        ids = {row.id for row in rows if row.booking_status == "cancelled"}
+        ids.update(row.booking_id for row in deleted)
+        versions = {row.id: row.ticket_version for row in rows}
+        with self._lock:
+            # Keep local changes the queries above may have missed
+            self._local = {
+                booking_id: entry
+                for booking_id, entry in self._local.items()
+                if entry[0] >= started
+            }
+            for booking_id, (_, version) in self._local.items():
+                if version is None:
+                    ids.add(booking_id)
+                elif versions.get(booking_id, 0) < version:
+                    versions[booking_id] = version
+            self._ids = frozenset(ids)
+            self._versions = versions
+            self._loaded_at = time.monotonic()
+
+    def is_revoked(self, booking_id, version=None):
+        if time.monotonic() - self._loaded_at > self.refresh_seconds:
+            self.refresh()
+        if booking_id in self._ids:
+            return True
+        return version is not None and version < self._versions.get(booking_id, 0)
+
+
+ticket_signer = TicketSigner()
+revoked_tickets = RevocationSet()
+
+
+def record_deleted_bookings(connection, bookings):
+    """Insert tombstones for deleted bookings (rows with ``id`` and ``booking_date``)."""
+    rows = [
+        {
+            "booking_id": booking.id,
+            "booking_date": booking.booking_date,
+            "revoked_at": datetime.utcnow(),
+        }
+        for booking in bookings
+    ]
+    if rows:
+        connection.execute(insert(TicketRevocation.__table__), rows)
+
+
+# What a ticket token carries; status and payment changes keep the ticket valid
+_SIGNED_FIELDS = ("parking_slot_id", "vehicle_number", "booking_date", "start_time", "end_time")
+
+
+@event.listens_for(Booking, "before_update")
+def _bump_ticket_version(mapper, connection, booking):
+    state = inspect(booking)
+    if any(state.attrs[field].history.has_changes() for field in _SIGNED_FIELDS):
+        booking.ticket_version = (booking.ticket_version or 1) + 1
+
+
+@event.listens_for(Booking, "after_update")
+def _revoke_changed_booking(mapper, connection, booking):
+    if booking.booking_status == "cancelled":
+        on_commit(booking, revoked_tickets.add, booking.id)
+    elif inspect(booking).attrs.ticket_version.history.has_changes():
+        on_commit(booking, revoked_tickets.supersede, booking.id, booking.ticket_version)
+
+
+@event.listens_for(Booking, "after_delete")
+def _revoke_deleted_booking(mapper, connection, booking):
+    record_deleted_bookings(connection, [booking])
+    on_commit(booking, revoked_tickets.add, booking.id)
+
+
+def gate_auth_required(f):
+    """Allow gate devices (X-Gate-Key header) and logged-in admins."""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        gate_keys = current_app.config.get("GATE_API_KEYS") or []
+        supplied = request.headers.get("X-Gate-Key")
+        if supplied and any(hmac.compare_digest(supplied, key) for key in gate_keys):
+            return f(*args, **kwargs)
+        if current_user.is_authenticated and current_user.is_admin:
+            return f(*args, **kwargs)
+        return jsonify({"error": "Unauthorized"}), 401
+
+    return decorated_function
+
+
+def verify_ticket(token):
+    """Full gate check: signature, validity window and revocation."""
+    claims, reason = ticket_signer.verify(token)
+    if claims is None:
+        return None, reason
+    if revoked_tickets.is_revoked(claims["booking_id"], claims["version"]):
+        return None, "revoked"
+    return claims, None
+
+
+def _parse_event_time(value):
+    """Accept epoch seconds or ISO 8601; return a naive local datetime."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value)
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _parse_event(raw):
+    """Validate the shape of one event; returns (row, None) or (None, reason)."""
+    if not isinstance(raw, dict):
+        return None, "invalid_event"
+    event_id = raw.get("event_id")
+    if not isinstance(event_id, str) or not 0 < len(event_id) <= 64:
+        return None, "invalid_event_id"
+    if raw.get("type") not in GateEvent.EVENT_TYPES:
+        return None, "invalid_type"
+    try:
+        booking_id = int(raw.get("booking_id"))
+        occurred_at = _parse_event_time(raw.get("occurred_at"))
+        # Optional; compared with the booking's location, so it must be an int
+        location_id = raw.get("parking_location_id")
+        if location_id is not None:
+            location_id = int(location_id)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None, "invalid_booking_or_time"
+    gate_id = raw.get("gate_id")
+    return {
+        "event_id": event_id,
+        "booking_id": booking_id,
+        "parking_location_id": location_id,
+        "event_type": raw["type"],
+        "gate_id": str(gate_id)[:50] if gate_id is not None else None,
+        "occurred_at": occurred_at,
+    }, None
+
+
+def _booking_rejection(row, booking, grace):
+    """Why an event does not match its booking, or None if it does."""
+    if booking is None:
+        return "unknown_booking"
+    if row["parking_location_id"] not in (None, booking.parking_location_id):
+        return "wrong_location"
+    start = datetime.combine(booking.booking_date, booking.start_time) - grace
+    end = datetime.combine(booking.booking_date, booking.end_time) + grace
+    if row["event_type"] == "entry":
+        if booking.booking_status != "confirmed":
+            return "booking_not_active"
+        if not start <= row["occurred_at"] <= end:
+            return "outside_booking_window"
+    else:
+        # The expiry job may already have completed an overstaying booking
+        if booking.booking_status not in ("confirmed", "completed"):
+            return "booking_not_active"
+        if row["occurred_at"] < start:
+            return "outside_booking_window"
+    return None
+
+
+def _insert_ignoring_duplicates():
+    """Bulk INSERT that skips rows whose event_id already exists."""
+    stmt = insert(GateEvent.__table__)
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "mysql":
+        return stmt.prefix_with("IGNORE")
+    if dialect == "sqlite":
+        return stmt.prefix_with("OR IGNORE")
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+        return pg_insert(GateEvent.__table__).on_conflict_do_nothing(
+            index_elements=["event_id"]
+        )
+    return stmt
+
+
+def ingest_gate_events(raw_events):
+    """
+    Validate and store a batch of gate events.
+
+    Each batch costs three statements regardless of its size: one lookup of
+    already stored event ids, one lookup of the referenced bookings and one
+    multi-row INSERT. Re-sent events are reported as duplicates and never
+    stored twice, so gates can safely retry a whole batch.
+    """
+    grace = ticket_signer.grace
+    rejected = []
+    rows = {}
+    for raw in raw_events:
+        row, reason = _parse_event(raw)
+        if row is None:
+            event_id = raw.get("event_id") if isinstance(raw, dict) else None
+            rejected.append({"event_id": event_id, "reason": reason})
+            continue
+        rows.setdefault(row["event_id"], row)
+    duplicates = len(raw_events) - len(rejected) - len(rows)
+
+    if rows:
+        stored = {
+            event_id
+            for (event_id,) in db.session.query(GateEvent.event_id).filter(
+                GateEvent.event_id.in_(list(rows))
+            )
+        }
+        duplicates += len(stored)
+        for event_id in stored:
+            del rows[event_id]
+
+    if rows:
+        bookings = {
+            booking.id: booking
+            for booking in db.session.query(
+                Booking.id,
+                Booking.parking_location_id,
+                Booking.booking_date,
+                Booking.start_time,
+                Booking.end_time,
+                Booking.booking_status,
+            ).filter(Booking.id.in_({row["booking_id"] for row in rows.values()}))
+        }
+        now = datetime.utcnow()
+        valid_rows = []
+        for row in rows.values():
+            booking = bookings.get(row["booking_id"])
+            reason = _booking_rejection(row, booking, grace)
+            if reason is not None:
+                rejected.append({"event_id": row["event_id"], "reason": reason})
+                continue
+            row["parking_location_id"] = booking.parking_location_id
+            row["received_at"] = now
+            valid_rows.append(row)
+
+        if valid_rows:
+            db.session.execute(_insert_ignoring_duplicates(), valid_rows)
+            db.session.commit()
+        rows = valid_rows
+
+    return {"accepted": len(rows), "duplicates": duplicates, "rejected": rejected}
@@ -0,0 +1,191 @@
+"""
+Offline gate snapshots.
+For each location, a compact list of the tickets valid today that gates can
+download and check scanned QR tokens against while their uplink is down.
+A snapshot holds the sorted 8-byte SHA-256 prefixes of every valid ticket
+token plus a Bloom filter over the same digests for fast negative checks.
+Versions are content hashes, so any worker that has built a version can serve
+a delta from it.
+"""
+import base64
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from app.extensions import db
+from app.models.booking import Booking
+from app.models.parking_slot import ParkingSlot
+from app.parking.gate import revoked_tickets, ticket_signer
+
+DIGEST_BYTES = 8
+
+
+def token_digest(token):
+    """Digest a gate looks up for a scanned QR token."""
+    return hashlib.sha256(token.encode("utf-8")).digest()[:DIGEST_BYTES]
+
+
+def _pack(digests):
+    return base64.b64encode(b"".join(sorted(digests))).decode("ascii")
+
+
+class BloomFilter:
+    """
+    Bloom filter over token digests.
+
+    Bit positions use double hashing on the digest itself:
+    ``(h1 + i * h2) mod m`` for ``i`` in ``0..k-1``, with ``h1`` and ``h2``
+    the big-endian first and last four bytes of the digest (``h2`` forced odd).
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest):
+        h1 = int.from_bytes(digest[:4], "big")
+        h2 = int.from_bytes(digest[4:8], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, digest):
+        for position in self._positions(digest):
+            self.bits[position // 8] |= 1 << (position % 8)
+
+    def __contains__(self, digest):
+        return all(
+            self.bits[position // 8] & (1 << (position % 8))
+            for position in self._positions(digest)
+        )
+
+    def to_dict(self):
+        return {
+            "m": self.size,
+            "k": self.hash_count,
+            "bits": base64.b64encode(bytes(self.bits)).decode("ascii"),
+        }
+
+
+def valid_ticket_digests(location_id, today=None):
+    """
+    Digests of the tokens of every confirmed, unrevoked booking for today
+    whose validity window has not ended.
+    """
+    today = today or date.today()
+    rows = (
+        db.session.query(Booking, ParkingSlot.slot_number)
+        .join(ParkingSlot, Booking.parking_slot_id == ParkingSlot.id)
+        .filter(
+            Booking.parking_location_id == location_id,
+            Booking.booking_date == today,
+            Booking.booking_status == "confirmed",
+        )
+        .all()
+    )
+    now = time.time()
+    digests = set()
+    for booking, slot_number in rows:
+        if revoked_tickets.is_revoked(booking.id):
+            continue
+        _, valid_until = ticket_signer.validity_window(booking)
+        if valid_until < now:
+            continue
+        token = ticket_signer.sign(booking, SimpleNamespace(slot_number=slot_number))
+        digests.add(token_digest(token))
+    return frozenset(digests)
+
+
+class GateSnapshotStore:
+    """
+    Builds snapshots per location and keeps recent versions for deltas.
+
+    A location's snapshot is rebuilt at most once every ``ttl`` seconds; the
+    digest sets of the last ``history_size`` versions are kept in memory so a
+    gate that sends ``since=<version>`` only receives what changed. Gates add
+    delta additions to their Bloom filter and drop removals from the sorted
+    array only (a Bloom filter can't forget), so they should fetch a full
+    snapshot again now and then.
+    """
+
+    def __init__(self):
+        self.ttl = 30
+        self.history_size = 64
+        self.error_rate = 0.01
+        self._current = {}
+        self._history = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get("GATE_SNAPSHOT_TTL_SECONDS", 30)
+        self.history_size = app.config.get("GATE_SNAPSHOT_HISTORY", 64)
+        self.error_rate = app.config.get("GATE_SNAPSHOT_BLOOM_ERROR_RATE", 0.01)
+
+    def _version(self, location_id, today, digests):
+        content = hashlib.sha256(b"".join(sorted(digests))).hexdigest()[:16]
+        return f"{location_id}:{today.isoformat()}:{content}"
+
+    def current(self, location_id):
+        """Return ``(version, digests)`` for the location, rebuilding if stale."""
+        today = date.today()
+        cached = self._current.get(location_id)
+        if cached and cached[0] == today and time.monotonic() - cached[1] < self.ttl:
+            return cached[2], cached[3]
+
+        # Let the expiry job complete ended bookings first
+        Booking.release_expired_slots()
+        digests = valid_ticket_digests(location_id, today)
+        version = self._version(location_id, today, digests)
+        with self._lock:
+            self._current[location_id] = (today, time.monotonic(), version, digests)
+            # Keyed by location too: a version sent for another location is unknown
+            self._history[(location_id, version)] = digests
+            self._history.move_to_end((location_id, version))
+            while len(self._history) > self.history_size:
+                self._history.popitem(last=False)
+        return version, digests
+
+    def snapshot(self, location_id):
+        """Full snapshot payload."""
+        version, digests = self.current(location_id)
+        bloom = BloomFilter(len(digests), self.error_rate)
+        for digest in digests:
+            bloom.add(digest)
+        return {
+            "type": "full",
+            "location_id": location_id,
+            "version": version,
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "count": len(digests),
+            "digest": f"sha256[:{DIGEST_BYTES}]",
+            "hashes": _pack(digests),
+            "bloom": bloom.to_dict(),
+        }
+
+    def delta(self, location_id, since):
+        """
+        Changes since version ``since``, or the full snapshot when that version
+        is unknown here for this location (too old, another day, another
+        location's version, or built by another worker).
+        """
+        version, digests = self.current(location_id)
+        previous = self._history.get((location_id, since))
+        if previous is None:
+            return self.snapshot(location_id)
+        return {
+            "type": "delta",
+            "location_id": location_id,
+            "version": version,
+            "since": since,
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "count": len(digests),
+            "added": _pack(digests - previous),
+            "removed": _pack(previous - digests),
+        }
+
+
+gate_snapshots = GateSnapshotStore()
@@ -0,0 +1,143 @@
+"""
+In-memory index of today's confirmed bookings by location and plate, so gates
+and enforcement can ask "does this vehicle have an active booking here now?"
+without touching the database.
+"""
+import threading
+import time
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models.booking import Booking, normalize_plate
+from app.utils.unit_of_work import on_commit
+
+
+class ActivePlateIndex:
+    """
+    ``{location_id: {plate: {booking_id: entry}}}`` for today's confirmed bookings.
+
+    Bookings changed in this process are applied as soon as the change is
+    committed; the whole index is reloaded from the database (one indexed query)
+    when the day changes and every ``refresh_seconds`` to pick up changes made
+    by other workers. A lookup is two dict reads plus a window check over the
+    handful of bookings one plate has on one day.
+    """
+
+    def __init__(self):
+        self.refresh_seconds = 60
+        self._day = None
+        self._loaded_at = 0
+        self._plates = {}
+        self._by_booking = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.refresh_seconds = app.config.get("PLATE_INDEX_REFRESH_SECONDS", 60)
+
+    @staticmethod
+    def _entry(booking):
+        return {
+            "booking_id": booking.id,
+            "parking_slot_id": booking.parking_slot_id,
+            "start": datetime.combine(booking.booking_date, booking.start_time),
+            "end": datetime.combine(booking.booking_date, booking.end_time),
+        }
+
+    def _add(self, plates, by_booking, booking):
+        location_plates = plates.setdefault(booking.parking_location_id, {})
+        location_plates.setdefault(booking.vehicle_plate, {})[booking.id] = self._entry(
+            booking
+        )
+        by_booking[booking.id] = (booking.parking_location_id, booking.vehicle_plate)
+
+    def _remove(self, booking_id):
+        key = self._by_booking.pop(booking_id, None)
+        if key is None:
+            return
+        location_id, plate = key
+        location_plates = self._plates.get(location_id, {})
+        bookings = location_plates.get(plate)
+        if bookings is not None:
+            bookings.pop(booking_id, None)
+            if not bookings:
+                del location_plates[plate]
+
+    def reload(self):
+        today = date.today()
+        rows = db.session.query(
+            Booking.id,
+            Booking.parking_location_id,
+            Booking.parking_slot_id,
+            Booking.vehicle_plate,
+            Booking.booking_date,
+            Booking.start_time,
+            Booking.end_time,
+        ).filter(Booking.booking_date == today, Booking.booking_status == "confirmed")
+        plates, by_booking = {}, {}
+        for row in rows:
+            self._add(plates, by_booking, row)
+        with self._lock:
+            self._plates, self._by_booking = plates, by_booking
+            self._day = today
+            self._loaded_at = time.monotonic()
+
+    def track(self, booking):
+        """Apply an inserted or updated booking to the index."""
+        if self._day is None:
+            return
+        with self._lock:
+            self._remove(booking.id)
+            if booking.booking_status == "confirmed" and booking.booking_date == self._day:
+                self._add(self._plates, self._by_booking, booking)
+
+    def discard(self, booking_id):
+        """Drop a deleted booking from the index."""
+        with self._lock:
+            self._remove(booking_id)
+
+    def lookup(self, location_id, vehicle_number, now=None):
+        """Return the booking entry active for the plate right now, or None."""
+        now = now or datetime.now()
+        if (
+            self._day != now.date()
+            or time.monotonic() - self._loaded_at > self.refresh_seconds
+        ):
+            self.reload()
+        bookings = self._plates.get(location_id, {}).get(normalize_plate(vehicle_number))
+        if not bookings:
+            return None
+        for entry in list(bookings.values()):
+            if entry["start"] <= now <= entry["end"]:
+                return entry
+        return None
+
+
+active_plates = ActivePlateIndex()
+
+
+_TRACKED_FIELDS = (
+    "id",
+    "parking_location_id",
+    "parking_slot_id",
+    "vehicle_plate",
+    "booking_date",
+    "start_time",
+    "end_time",
+    "booking_status",
+)
+
+
+@event.listens_for(Booking, "after_insert")
+@event.listens_for(Booking, "after_update")
+def _track_booking_plate(mapper, connection, booking):
+    # Copy the values now: after the commit the booking is expired
+    snapshot = SimpleNamespace(**{field: getattr(booking, field) for field in _TRACKED_FIELDS})
+    on_commit(booking, active_plates.track, snapshot)
+
+
+@event.listens_for(Booking, "after_delete")
+def _discard_booking_plate(mapper, connection, booking):
+    on_commit(booking, active_plates.discard, booking.id)
@@ -9,21 +9,32 @@ from flask import (
     flash,
     session,
     make_response,
+    send_file,
 )
 from flask_login import login_required, current_user
 from app.models.parking_location import ParkingLocation
 from app.models.parking_slot import ParkingSlot
 from app.models.booking import Booking
 from app import db
+from app.extensions import csrf
+from app.utils.db_routing import read_replica
+from app.utils.unit_of_work import after_commit, unit_of_work
 from datetime import datetime, timedelta, date, time
 import random
 import re
-import qrcode
-from io import BytesIO
 import base64
-from fpdf import FPDF
-import tempfile
-import os
+from io import BytesIO
+from app.parking.drafts import booking_drafts
+from app.parking.gate import gate_auth_required, ingest_gate_events, verify_ticket
+from app.parking.gate_snapshot import gate_snapshots
+from app.parking.plates import active_plates
+from app.parking.tickets import (
+    export_tickets_response,
+    get_ticket_pdf,
+    get_ticket_qr,
+    prerender_ticket,
+    ticket_details,
+)
 
 # Create the parking blueprint
 parking = Blueprint("parking", __name__, url_prefix="/parking")
@@ -39,6 +50,7 @@ def find_parking():
 
 @parking.route("/api/locations")
 @login_required
+@read_replica
 def get_locations():
     from app.models.parking_slot import ParkingSlot  
 
@@ -48,9 +60,7 @@ def get_locations():
     result = []
 
     for location in locations:
-        available = ParkingSlot.query.filter_by(
-            parking_location_id=location.id, is_available=True
-        ).count()
+        available = ParkingSlot.count_available(location.id)
 
         result.append(
             {
@@ -77,6 +87,7 @@ def get_locations():
 
 @parking.route("/api/locations/<int:location_id>")
 @login_required
+@read_replica
 def get_location(location_id):
     """API endpoint to get a specific parking location as JSON."""
     location = ParkingLocation.get_by_id(location_id)
@@ -87,11 +98,12 @@ def get_location(location_id):
 
 @parking.route("/booking_details/<int:parking_id>", methods=["GET", "POST"])
 @login_required
+@unit_of_work
 def booking_details(parking_id):
     """
     Handle booking details form.
     GET: Show the form with date and time selection.
-    POST: Process the form data and redirect to the slot selection page.
+    POST: Store the details in a booking draft and redirect to the slot selection page.
     """
     # Get the parking location
     location = ParkingLocation.get_by_id(parking_id)
@@ -104,8 +116,9 @@ def booking_details(parking_id):
     booking = None
 
     if booking_id:
-        booking = Booking.get_by_id(booking_id)
-        if not booking or booking.user_id != current_user.id:
+        # Only drafts can be edited; confirmed bookings are paid for as they are
+        booking = booking_drafts.get(booking_id, current_user.id)
+        if not booking or booking.parking_location_id != parking_id:
             flash("Invalid booking", "danger")
             return redirect(url_for("parking.find_parking"))
         
@@ -203,34 +216,20 @@ def booking_details(parking_id):
                     "parking/booking_details.html", location=location, booking=booking
                 )
 
-            # Calculate cost
-            total_price = duration_hours * location.hourly_rate
-            # Round to nearest whole number based on tenths digit
-            total_price = round(total_price)
-
-            # Create or update booking record in database
-            if booking:
-                # Update existing booking
-                booking.booking_date = booking_date
-                booking.start_time = start_time_obj
-                booking.end_time = end_time_obj
-                booking.duration_hours = round(duration_hours, 2)
-                booking.total_price = total_price
-                booking.vehicle_number = vehicle_number
-                db.session.commit()
-            else:
-                # Create new booking
-                booking = Booking.create_booking(
-                    parking_location_id=parking_id,
-                    booking_date=booking_date,
-                    start_time=start_time_obj,
-                    end_time=end_time_obj,
-                    duration_hours=round(duration_hours, 2),
-                    total_price=total_price,
-                    vehicle_number=vehicle_number,
-                )
+            # Create or update the draft; nothing is written to the database
+            # until the payment is confirmed
+            if booking is None:
+                booking = booking_drafts.create(current_user.id, parking_id)
+            booking.update_details(
+                booking_date,
+                start_time_obj,
+                end_time_obj,
+                round(duration_hours, 2),
+                vehicle_number,
+            )
+            booking_drafts.save(booking)
 
-            # Redirect to slot selection page with booking ID
+            # Redirect to slot selection page with the draft ID
             return redirect(url_for("parking.booking_slot", booking_id=booking.id))
 
         except ValueError as e:
@@ -243,9 +242,7 @@ def booking_details(parking_id):
     # For GET request, show the form with live available slots
     from app.models.parking_slot import ParkingSlot
 
-    available_slots = ParkingSlot.query.filter_by(
-        parking_location_id=location.id, is_available=True
-    ).count()
+    available_slots = ParkingSlot.count_available(location.id)
 
     return render_template(
         "parking/booking_details.html",
@@ -257,6 +254,7 @@ def booking_details(parking_id):
 
 @parking.route("/booking_slot", methods=["GET", "POST"])
 @login_required
+@unit_of_work
 def booking_slot():
     """
     Handle slot selection.
@@ -269,10 +267,10 @@ def booking_slot():
         flash("Invalid booking", "danger")
         return redirect(url_for("parking.find_parking"))
 
-    # Get booking from database
-    booking = Booking.get_by_id(booking_id)
-    if not booking or booking.user_id != current_user.id:
-        flash("Invalid booking", "danger")
+    # Get the booking draft
+    booking = booking_drafts.get(booking_id, current_user.id)
+    if not booking:
+        flash("Invalid or expired booking, please start again", "danger")
         return redirect(url_for("parking.find_parking"))
 
     # Get parking location
@@ -311,8 +309,9 @@ def booking_slot():
                 "parking/booking_slot.html", location=location, booking=booking
             )
 
-        # Update booking with slot details (do NOT reserve the slot yet)
+        # Update the draft with slot details (do NOT reserve the slot yet)
         booking.update_slot_details(slot_id, vehicle_type)
+        booking_drafts.save(booking)
 
         # Do NOT reserve the slot here!
         # ParkingSlot.reserve_slot(slot_id)
@@ -330,8 +329,23 @@ def booking_slot():
     )
 
 
+def book_draft(draft, payment_method):
+    """
+    Insert the paid, confirmed booking for a draft, priced from the location's
+    current rate, and delete the draft; the view's unit of work commits both.
+    """
+    booking = draft.to_booking()
+    booking.update_payment_details(payment_method, "paid")
+    db.session.add(booking)
+    booking_drafts.discard(draft)
+    # Assigns the id used in the redirect
+    db.session.flush()
+    return booking
+
+
 @parking.route("/booking_confirmation", methods=["GET", "POST"])
 @login_required
+@unit_of_work
 def booking_confirmation():
     """Display booking confirmation details and handle payment."""
     booking_id = request.args.get("booking_id")
@@ -339,9 +353,9 @@ def booking_confirmation():
         flash("Invalid booking", "danger")
         return redirect(url_for("parking.find_parking"))
 
-    booking = Booking.get_by_id(booking_id)
-    if not booking or booking.user_id != current_user.id:
-        flash("Invalid booking", "danger")
+    booking = booking_drafts.get(booking_id, current_user.id)
+    if not booking:
+        flash("Invalid or expired booking, please start again", "danger")
         return redirect(url_for("parking.find_parking"))
 
     location = ParkingLocation.get_by_id(booking.parking_location_id)
@@ -370,6 +384,15 @@ def booking_confirmation():
                 slot=slot,
             )
 
+        if payment_method not in ("cash", "razorpay"):
+            flash("Invalid payment method", "danger")
+            return render_template(
+                "parking/booking_confirmation.html",
+                booking=booking,
+                location=location,
+                slot=slot,
+            )
+
         # Check slot availability before payment
         if not slot or not slot.is_available:
             flash(
@@ -386,29 +409,19 @@ def booking_confirmation():
 
         # Handle different payment methods
         if payment_method == "cash":
-            booking.update_payment_details(payment_method, "paid")
-            booking.booking_status = "confirmed"
-            db.session.commit()
+            booking = book_draft(booking, payment_method)
+            after_commit(prerender_ticket, booking, location, slot)
 
             flash("Booking confirmed! Please pay at the parking location.", "success")
             return redirect(url_for("parking.parking_ticket", booking_id=booking.id))
 
-        elif payment_method == "razorpay":
-            # In a real application, you would integrate with RazorPay API here
-            # For now, just simulate a successful payment
-            booking.update_payment_details(payment_method, "paid")
+        # In a real application, you would integrate with RazorPay API here
+        # For now, just simulate a successful payment
+        booking = book_draft(booking, payment_method)
+        after_commit(prerender_ticket, booking, location, slot)
 
-            flash("Payment successful! Your booking has been confirmed.", "success")
-            return redirect(url_for("parking.parking_ticket", booking_id=booking.id))
-
-        else:
-            flash("Invalid payment method", "danger")
-            return render_template(
-                "parking/booking_confirmation.html",
-                booking=booking,
-                location=location,
-                slot=slot,
-            )
+        flash("Payment successful! Your booking has been confirmed.", "success")
+        return redirect(url_for("parking.parking_ticket", booking_id=booking.id))
 
     # For GET request, show the confirmation page
     return render_template(
@@ -421,6 +434,7 @@ def booking_confirmation():
 
 @parking.route("/api/slots/<int:location_id>/<vehicle_type>")
 @login_required
+@read_replica
 def get_slots(location_id, vehicle_type):
     """API endpoint to get available slots by location and vehicle type."""
     if vehicle_type not in ["two-wheeler", "four-wheeler"]:
@@ -446,37 +460,12 @@ def parking_ticket(booking_id):
     location = ParkingLocation.query.get(booking.parking_location_id)
     parking_slot = ParkingSlot.query.get_or_404(booking.parking_slot_id)
 
-    # Create a QR code with booking details
-    # Create QR code data with booking information
-    qr_data = f"Booking ID: {booking.id}\nLocation: {location.name}\nVehicle: {booking.vehicle_number}\nDate: {booking.booking_date.strftime('%Y-%m-%d')}\nTime: {booking.start_time.strftime('%H:%M')} to {booking.end_time.strftime('%H:%M')}\nSlot: {parking_slot.slot_number}"
-
-    # Generate QR code
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(qr_data)
-    qr.make(fit=True)
-
-    img = qr.make_image(fill_color="black", back_color="white")
+    _, duration_hours, total_price = ticket_details(booking, location, parking_slot)
 
-    # Save QR code to BytesIO buffer
-    buffer = BytesIO()
-    img.save(buffer)
-    buffer.seek(0)
-
-    # Generate base64 string for the QR code image
-    qr_code_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
-
-    # Calculate duration and total price - use parking_slot rate instead of location rate
-    duration_hours = (booking.end_time.hour - booking.start_time.hour) + (
-        booking.end_time.minute - booking.start_time.minute
-    ) / 60
-    total_price = duration_hours * parking_slot.hourly_rate
-    # Round to nearest whole number based on tenths digit
-    total_price = round(total_price)
+    # Generate base64 string for the (cached) QR code image
+    qr_code_base64 = base64.b64encode(
+        get_ticket_qr(booking, location, parking_slot)
+    ).decode("utf-8")
 
     # Render ticket HTML template
     return render_template(
@@ -506,93 +495,138 @@ def parking_ticket_pdf(booking_id):
     location = ParkingLocation.query.get(booking.parking_location_id)
     parking_slot = ParkingSlot.query.get_or_404(booking.parking_slot_id)
 
-    # Create QR code
-    import qrcode
-    from io import BytesIO
+    # Stream the (cached) PDF from memory; the artifact key doubles as ETag
+    pdf, key = get_ticket_pdf(booking, location, parking_slot)
+    return send_file(
+        BytesIO(pdf),
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name=f"parking_ticket_{booking.id}.pdf",
+        etag=key,
+        conditional=True,
+    )
 
-    # Create QR code data with booking information
-    qr_data = f"Booking ID: {booking.id}\nLocation: {location.name}\nVehicle: {booking.vehicle_number}\nDate: {booking.booking_date.strftime('%Y-%m-%d')}\nTime: {booking.start_time.strftime('%H:%M')} to {booking.end_time.strftime('%H:%M')}\nSlot: {parking_slot.slot_number}"
 
-    # Generate QR code
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(qr_data)
-    qr.make(fit=True)
-
-    img = qr.make_image(fill_color="black", back_color="white")
-
-    # Save QR code to a temporary file
-    qr_file = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-    img.save(qr_file.name)
-
-    # Calculate duration and total price - use parking_slot rate instead of location rate
-    duration_hours = (booking.end_time.hour - booking.start_time.hour) + (
-        booking.end_time.minute - booking.start_time.minute
-    ) / 60
-    total_price = duration_hours * parking_slot.hourly_rate
-    # Round to nearest whole number based on tenths digit
-    total_price = round(total_price)
-
-    # Create PDF
-    pdf = FPDF()
-    pdf.add_page()
-
-    # Add title
-    pdf.set_font("Arial", "B", 16)
-    pdf.cell(190, 10, "PARKING TICKET", 0, 1, "C")
-
-    # Add booking details
-    pdf.set_font("Arial", "", 12)
-    pdf.cell(190, 10, f"Booking ID: {booking.id}", 0, 1)
-    pdf.cell(190, 10, f"Parking Location: {location.name}", 0, 1)
-    pdf.cell(190, 10, f"Address: {location.address}", 0, 1)
-    pdf.cell(190, 10, f"Vehicle Number: {booking.vehicle_number}", 0, 1)
-    pdf.cell(190, 10, f"Vehicle Type: {booking.vehicle_type}", 0, 1)
-    pdf.cell(190, 10, f'Date: {booking.booking_date.strftime("%Y-%m-%d")}', 0, 1)
-    pdf.cell(
-        190,
-        10,
-        f'Time: {booking.start_time.strftime("%H:%M")} to {booking.end_time.strftime("%H:%M")}',
-        0,
-        1,
-    )
-    pdf.cell(190, 10, f"Slot Number: {parking_slot.slot_number}", 0, 1)
-    pdf.cell(190, 10, f"Duration: {round(duration_hours, 1)} hours", 0, 1)
-    pdf.cell(190, 10, f"Total Price: Rs.{round(total_price, 2)}", 0, 1)
-    pdf.cell(190, 10, f"Payment Status: {booking.payment_status.title()}", 0, 1)
-
-    # Add QR code
-    pdf.image(qr_file.name, x=75, y=160, w=60)
-
-    # Add instructions
-    pdf.set_font("Arial", "I", 10)
-    pdf.cell(190, 10, "Instructions:", 0, 1)
-    pdf.multi_cell(
-        190,
-        5,
-        "1. Show this ticket to the parking attendant.\n2. Please park your vehicle in the designated slot.\n3. Contact support at support@smartparking.com for assistance.",
+@parking.route("/tickets/export")
+@login_required
+def export_tickets():
+    """
+    Download several of the current user's tickets at once.
+    Query parameters: booking_ids (comma separated, defaults to all confirmed
+    bookings) and format (zip or pdf).
+    """
+    query = Booking.query.filter(
+        Booking.user_id == current_user.id, Booking.booking_status == "confirmed"
     )
 
-    # Create response
-    response = make_response(pdf.output(dest="S").encode("latin1"))
-    response.headers.set(
-        "Content-Disposition",
-        f"attachment",
-        filename=f"parking_ticket_{booking.id}.pdf",
+    booking_ids = request.args.get("booking_ids")
+    if booking_ids:
+        try:
+            ids = [int(i) for i in booking_ids.split(",") if i.strip()]
+        except ValueError:
+            return jsonify({"error": "Invalid booking ids"}), 400
+        query = query.filter(Booking.id.in_(ids))
+
+    return export_tickets_response(query, request.args.get("format", "zip"))
+
+
+@parking.route("/api/gate/verify", methods=["POST"])
+@csrf.exempt
+@gate_auth_required
+def gate_verify():
+    """
+    Check a scanned ticket QR token at the gate.
+    The token is verified from its signature alone; the only lookup is the
+    in-memory revocation set of cancelled, deleted and edited bookings.
+    """
+    data = request.get_json(silent=True) or {}
+    token = data.get("token") or request.form.get("token")
+    if not token:
+        return jsonify({"error": "Missing token"}), 400
+
+    claims, reason = verify_ticket(token.strip())
+    if claims is None:
+        return jsonify({"valid": False, "reason": reason})
+
+    return jsonify(
+        {
+            "valid": True,
+            "booking_id": claims["booking_id"],
+            "slot_number": claims["slot_number"],
+            "vehicle_number": claims["vehicle_number"],
+            "valid_from": datetime.fromtimestamp(claims["valid_from"]).isoformat(),
+            "valid_until": datetime.fromtimestamp(claims["valid_until"]).isoformat(),
+        }
     )
-    response.headers.set("Content-Type", "application/pdf")
 
-    return response
+
+@parking.route("/api/gate/events", methods=["POST"])
+@csrf.exempt
+@gate_auth_required
+def gate_events():
+    """
+    Batch ingestion of barrier entry/exit events.
+    Body: {"events": [{"event_id", "booking_id", "type": "entry"|"exit",
+    "occurred_at" (ISO 8601 or epoch seconds), "gate_id", "parking_location_id"}]}.
+    Events are idempotent on event_id, so a failed batch can be re-sent as is.
+    """
+    data = request.get_json(silent=True) or {}
+    events = data.get("events")
+    if not isinstance(events, list) or not events:
+        return jsonify({"error": "Missing events"}), 400
+
+    limit = current_app.config.get("GATE_EVENT_BATCH_MAX", 1000)
+    if len(events) > limit:
+        return jsonify({"error": f"At most {limit} events per request"}), 413
+
+    return jsonify(ingest_gate_events(events))
+
+
+@parking.route("/api/gate/snapshot/<int:location_id>")
+@gate_auth_required
+def gate_snapshot(location_id):
+    """
+    Offline validation snapshot of today's valid tickets for a location.
+    Pass since=<version> to receive only the changes since that version; the
+    response ETag is the version, so If-None-Match returns 304 when unchanged.
+    """
+    ParkingLocation.query.get_or_404(location_id)
+
+    since = request.args.get("since")
+    if since:
+        payload = gate_snapshots.delta(location_id, since)
+    else:
+        payload = gate_snapshots.snapshot(location_id)
+
+    response = jsonify(payload)
+    response.set_etag(payload["version"])
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+
+@parking.route("/api/gate/plates/<int:location_id>/<vehicle_number>")
+@gate_auth_required
+def active_booking_by_plate(location_id, vehicle_number):
+    """Whether a vehicle has an active booking at a location right now."""
+    entry = active_plates.lookup(location_id, vehicle_number)
+    if entry is None:
+        return jsonify({"active": False})
+
+    return jsonify(
+        {
+            "active": True,
+            "booking_id": entry["booking_id"],
+            "parking_slot_id": entry["parking_slot_id"],
+            "start": entry["start"].isoformat(),
+            "end": entry["end"].isoformat(),
+        }
+    )
 
 
 def seed_parking_locations():
     """
     Seed the database with initial parking locations.
-    This function is called during app initialization if no locations exist.
+    This function is called by the ``flask seed`` command if no locations exist.
     """
     # Only seed if there are no existing locations
     if ParkingLocation.query.count() == 0:
@@ -607,7 +641,6 @@ def seed_parking_locations():
                 "latitude": 23.0372,
                 "longitude": 72.5324,
                 "total_slots": 150,
-                "available_slots": 150,
                 "hourly_rate": 50.0,
                 "opening_time": "10:00",
                 "closing_time": "22:00",
@@ -623,7 +656,6 @@ def seed_parking_locations():
                 "latitude": 23.0463,
                 "longitude": 72.5321,
                 "total_slots": 120,
-                "available_slots": 120,
                 "hourly_rate": 30.0,
                 "opening_time": "09:00",
                 "closing_time": "23:00",
@@ -639,7 +671,6 @@ def seed_parking_locations():
                 "latitude": 23.0458,
                 "longitude": 72.5095,
                 "total_slots": 200,
-                "available_slots": 200,
                 "hourly_rate": 50.0,
                 "opening_time": "10:00",
                 "closing_time": "22:00",
@@ -655,7 +686,6 @@ def seed_parking_locations():
                 "latitude": 23.0348,
                 "longitude": 72.5578,
                 "total_slots": 100,
-                "available_slots": 100,
                 "hourly_rate": 30.0,
                 "opening_time": "09:30",
                 "closing_time": "22:30",
@@ -671,7 +701,6 @@ def seed_parking_locations():
                 "latitude": 23.0225,
                 "longitude": 72.5714,
                 "total_slots": 180,
-                "available_slots": 180,
                 "hourly_rate": 30.0,
                 "opening_time": "06:00",
                 "closing_time": "23:00",
@@ -687,7 +716,6 @@ def seed_parking_locations():
                 "latitude": 23.0331,
                 "longitude": 72.5109,
                 "total_slots": 140,
-                "available_slots": 140,
                 "hourly_rate": 40.0,
                 "opening_time": "10:00",
                 "closing_time": "22:00",
@@ -732,12 +760,13 @@ def seed_parking_locations():
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error with parking locations: {str(e)}")
+        raise
 
 
 def seed_parking_slots():
     """
     Seed the database with parking slots for each location.
-    This function is called during app initialization if no slots exist.
+    This function is called by the ``flask seed`` command if no slots exist.
     """
     # Only seed if there are no existing slots
     if ParkingSlot.query.count() == 0:
@@ -781,3 +810,4 @@ def seed_parking_slots():
         except Exception as e:
             db.session.rollback()
             current_app.logger.error(f"Error seeding parking slots: {str(e)}")
+            raise
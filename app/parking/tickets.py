@@ -0,0 +1,462 @@
+"""
+Rendering of parking tickets (QR code image and downloadable PDF).
+The QR code holds the signed gate token from ``app.parking.gate``. Rendered
+artifacts are cached on disk through ``ticket_cache``, and tickets are
+pre-rendered on a process pool as soon as a booking is confirmed.
+"""
+import atexit
+import hashlib
+import multiprocessing
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO, RawIOBase
+from types import SimpleNamespace
+
+from flask import Response, current_app, jsonify, send_file, stream_with_context
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload
+
+from app.extensions import db
+from app.models.booking import Booking
+from app.parking.gate import TOKEN_VERSION, ticket_signer
+from app.utils.artifact_cache import ticket_cache
+from app.utils.lazy import lazy_import
+from app.utils.unit_of_work import on_commit
+
+# Only needed when a ticket is actually rendered
+qrcode = lazy_import("qrcode")
+fpdf = lazy_import("fpdf")
+
+
+def ticket_details(booking, location, parking_slot):
+    """Return the QR payload, duration and total price shown on a ticket."""
+    qr_data = ticket_signer.sign(booking, parking_slot)
+
+    # Calculate duration and total price - use parking_slot rate instead of location rate
+    duration_hours = (booking.end_time.hour - booking.start_time.hour) + (
+        booking.end_time.minute - booking.start_time.minute
+    ) / 60
+    total_price = duration_hours * parking_slot.hourly_rate
+    # Round to nearest whole number based on tenths digit
+    total_price = round(total_price)
+
+    return qr_data, duration_hours, total_price
+
+
+def artifact_key(booking, location, parking_slot):
+    """Content hash of everything that ends up on the rendered ticket."""
+    content = "|".join(
+        str(value)
+        for value in (
+            booking.id,
+            booking.ticket_version,
+            booking.updated_at,
+            booking.vehicle_number,
+            booking.vehicle_type,
+            booking.booking_date,
+            booking.start_time,
+            booking.end_time,
+            booking.payment_status,
+            location.name,
+            location.address,
+            parking_slot.slot_number,
+            parking_slot.hourly_rate,
+            TOKEN_VERSION,
+            ticket_signer.key_id,
+        )
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+
+
+def render_qr_png(qr_data):
+    """Render QR code data to PNG bytes."""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(qr_data)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    buffer = BytesIO()
+    img.save(buffer)
+    return buffer.getvalue()
+
+
+def render_ticket_pdf(booking, location, parking_slot, qr_png):
+    """Build the PDF ticket in memory and return its bytes."""
+    pdf = fpdf.FPDF()
+    add_ticket_page(pdf, booking, location, parking_slot, qr_png)
+    return bytes(pdf.output())
+
+
+def add_ticket_page(pdf, booking, location, parking_slot, qr_png):
+    """Draw one ticket on a new page of ``pdf``."""
+    _, duration_hours, total_price = ticket_details(booking, location, parking_slot)
+
+    pdf.add_page()
+
+    # Add title
+    pdf.set_font("Helvetica", "B", 16)
+    pdf.cell(190, 10, "PARKING TICKET", align="C", new_x="LMARGIN", new_y="NEXT")
+
+    # Add booking details
+    pdf.set_font("Helvetica", "", 12)
+    lines = [
+        f"Booking ID: {booking.id}",
+        f"Parking Location: {location.name}",
+        f"Address: {location.address}",
+        f"Vehicle Number: {booking.vehicle_number}",
+        f"Vehicle Type: {booking.vehicle_type}",
+        f'Date: {booking.booking_date.strftime("%Y-%m-%d")}',
+        f'Time: {booking.start_time.strftime("%H:%M")} to {booking.end_time.strftime("%H:%M")}',
+        f"Slot Number: {parking_slot.slot_number}",
+        f"Duration: {round(duration_hours, 1)} hours",
+        f"Total Price: Rs.{round(total_price, 2)}",
+        f"Payment Status: {booking.payment_status.title()}",
+    ]
+    for line in lines:
+        pdf.cell(190, 10, line, new_x="LMARGIN", new_y="NEXT")
+
+    # Add QR code straight from memory (no temporary file)
+    pdf.image(BytesIO(qr_png), x=75, y=160, w=60)
+
+    # Add instructions
+    pdf.set_font("Helvetica", "I", 10)
+    pdf.cell(190, 10, "Instructions:", new_x="LMARGIN", new_y="NEXT")
+    pdf.multi_cell(
+        190,
+        5,
+        "1. Show this ticket to the parking attendant.\n2. Please park your vehicle in the designated slot.\n3. Contact support at support@smartparking.com for assistance.",
+    )
+
+
+def get_ticket_qr(booking, location, parking_slot):
+    """Return the ticket QR code PNG, rendering it only on a cache miss."""
+    key = artifact_key(booking, location, parking_slot)
+    png = ticket_cache.get(booking.id, key, "png")
+    if png is None:
+        qr_data, _, _ = ticket_details(booking, location, parking_slot)
+        png = render_qr_png(qr_data)
+        ticket_cache.put(booking.id, key, "png", png)
+    return png
+
+
+def get_ticket_pdf(booking, location, parking_slot):
+    """Return the ticket PDF and its artifact key, rendering only on a cache miss."""
+    key = artifact_key(booking, location, parking_slot)
+    pdf = ticket_cache.get(booking.id, key, "pdf")
+    if pdf is None:
+        qr_png = get_ticket_qr(booking, location, parking_slot)
+        pdf = render_ticket_pdf(booking, location, parking_slot, qr_png)
+        ticket_cache.put(booking.id, key, "pdf", pdf)
+    return pdf, key
+
+
+def _render_ticket(booking, location, parking_slot):
+    """Process pool entry point: render both artifacts from plain snapshots."""
+    qr_data, _, _ = ticket_details(booking, location, parking_slot)
+    qr_png = render_qr_png(qr_data)
+    return qr_png, render_ticket_pdf(booking, location, parking_slot, qr_png)
+
+
+def _render_ticket_qr(booking, location, parking_slot):
+    """Process pool entry point: render only the QR code PNG."""
+    qr_data, _, _ = ticket_details(booking, location, parking_slot)
+    return render_qr_png(qr_data)
+
+
+def _init_worker(key, grace):
+    """Process pool initializer: give spawned workers the QR signing key."""
+    ticket_signer.key = key
+    ticket_signer.grace = grace
+
+
+def _snapshot(obj, fields):
+    return SimpleNamespace(**{field: getattr(obj, field) for field in fields})
+
+
+def ticket_snapshot(booking, location, parking_slot):
+    """Plain, picklable copies of the fields a ticket is rendered from."""
+    return (
+        _snapshot(
+            booking,
+            (
+                "id",
+                "ticket_version",
+                "updated_at",
+                "vehicle_number",
+                "vehicle_type",
+                "booking_date",
+                "start_time",
+                "end_time",
+                "payment_status",
+            ),
+        ),
+        _snapshot(location, ("name", "address")),
+        _snapshot(parking_slot, ("slot_number", "hourly_rate")),
+    )
+
+
+class TicketRenderer:
+    """
+    Bounded process pool that renders tickets ahead of the first view.
+
+    The pool is created lazily so pre-forking servers start it in each worker
+    after the fork. At most ``max_pending`` jobs are queued; when the pool is
+    busy, pre-rendering is skipped and the ticket routes render on demand.
+    """
+
+    def __init__(self):
+        self.workers = 0
+        self.max_pending = 0
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.workers = app.config.get("TICKET_PRERENDER_WORKERS", 2)
+        self.max_pending = app.config.get("TICKET_PRERENDER_MAX_PENDING", 100)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(ticket_signer.key, ticket_signer.grace),
+            )
+            atexit.register(self.shutdown)
+        return self._executor
+
+    def submit(self, booking, location, parking_slot):
+        """Queue ticket rendering; returns False if skipped."""
+        if not self.workers or not ticket_cache.enabled:
+            return False
+
+        key = artifact_key(booking, location, parking_slot)
+        with self._lock:
+            if key in self._pending or len(self._pending) >= self.max_pending:
+                return False
+            self._pending.add(key)
+
+        booking_id = booking.id
+        snapshots = ticket_snapshot(booking, location, parking_slot)
+
+        def store(future):
+            with self._lock:
+                self._pending.discard(key)
+            if future.cancelled() or future.exception() is not None:
+                return
+            qr_png, pdf = future.result()
+            ticket_cache.put(booking_id, key, "png", qr_png)
+            ticket_cache.put(booking_id, key, "pdf", pdf)
+
+        try:
+            future = self._get_executor().submit(_render_ticket, *snapshots)
+        except RuntimeError:
+            # Pool is shutting down or broken; start a fresh one next time
+            self._executor = None
+            with self._lock:
+                self._pending.discard(key)
+            return False
+        future.add_done_callback(store)
+        return True
+
+    def map_ordered(self, fn, items, window=None):
+        """
+        Yield ``fn(*item)`` for each item in order, running on the pool.
+
+        At most ``window`` jobs are in flight, so memory stays bounded however
+        many items there are. Without workers the calls run inline.
+        """
+        if not self.workers:
+            for item in items:
+                yield fn(*item)
+            return
+
+        window = window or self.workers * 2
+        executor = self._get_executor()
+        in_flight = deque()
+        try:
+            for item in items:
+                in_flight.append(executor.submit(fn, *item))
+                if len(in_flight) >= window:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+ticket_renderer = TicketRenderer()
+
+
+def prerender_ticket(booking, location, parking_slot):
+    """Start rendering a confirmed booking's ticket in the background."""
+    return ticket_renderer.submit(booking, location, parking_slot)
+
+
+def _render_ticket_file(booking, location, parking_slot):
+    """Process pool entry point for bulk exports: the ticket PDF."""
+    return _render_ticket(booking, location, parking_slot)[1]
+
+
+def iter_ticket_snapshots(query, chunk_size=100):
+    """
+    Yield ticket snapshots for the bookings matched by ``query``.
+
+    Bookings are loaded in keyset-paginated chunks and detached from the
+    session afterwards, so large exports never hold every row at once.
+    """
+    last_id = 0
+    while True:
+        chunk = (
+            query.filter(Booking.id > last_id, Booking.parking_slot_id.isnot(None))
+            .options(
+                joinedload(Booking.parking_location), joinedload(Booking.parking_slot)
+            )
+            .order_by(Booking.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not chunk:
+            return
+        for booking in chunk:
+            yield ticket_snapshot(booking, booking.parking_location, booking.parking_slot)
+        for booking in chunk:
+            for obj in (booking, booking.parking_slot):
+                if obj in db.session:
+                    db.session.expunge(obj)
+        last_id = chunk[-1].id
+
+
+def iter_ticket_artifacts(snapshots, ext, render):
+    """
+    Yield ``(snapshot, bytes)`` in order for a bulk export.
+
+    Tickets already in ``ticket_cache`` are read from it; only the others are
+    rendered with ``render`` on the pool, and cached afterwards. Cached files
+    are read when their turn comes, so memory stays bounded.
+    """
+    jobs = deque()
+
+    def misses():
+        for snapshot in snapshots:
+            key = artifact_key(*snapshot)
+            cached = ticket_cache.contains(snapshot[0].id, key, ext)
+            jobs.append((snapshot, key, cached))
+            if not cached:
+                yield snapshot
+
+    def cached_runs():
+        while jobs and jobs[0][2]:
+            snapshot, key, _ = jobs.popleft()
+            data = ticket_cache.get(snapshot[0].id, key, ext)
+            if data is None:
+                # Evicted in the meantime
+                data = render(*snapshot)
+            yield snapshot, data
+
+    for data in ticket_renderer.map_ordered(render, misses()):
+        yield from cached_runs()
+        snapshot, key, _ = jobs.popleft()
+        ticket_cache.put(snapshot[0].id, key, ext, data)
+        yield snapshot, data
+    yield from cached_runs()
+
+
+class _ChunkWriter(RawIOBase):
+    """Unseekable sink that lets zipfile write into a response generator."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_tickets_zip(snapshots):
+    """Yield a ZIP archive of ticket PDFs chunk by chunk as they are rendered."""
+    stream = _ChunkWriter()
+    # PDFs are already compressed, so store them as-is
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_STORED) as archive:
+        for snapshot, pdf in iter_ticket_artifacts(snapshots, "pdf", _render_ticket_file):
+            archive.writestr(f"parking_ticket_{snapshot[0].id}.pdf", pdf)
+            yield stream.pop()
+    yield stream.pop()
+
+
+def render_tickets_pdf(snapshots):
+    """Render tickets into one multi-page PDF (missing QR codes are made on the pool)."""
+    pdf = fpdf.FPDF()
+    for snapshot, qr_png in iter_ticket_artifacts(snapshots, "png", _render_ticket_qr):
+        add_ticket_page(pdf, *snapshot, qr_png)
+    return bytes(pdf.output())
+
+
+def export_tickets_response(query, export_format="zip"):
+    """
+    Build the download response for a bulk ticket export.
+
+    ZIP exports are streamed and use bounded memory for any number of tickets.
+    A single PDF is built in memory by fpdf, so it is limited to
+    BULK_TICKET_PDF_MAX tickets.
+    """
+    if export_format == "pdf":
+        limit = current_app.config.get("BULK_TICKET_PDF_MAX", 200)
+        if query.filter(Booking.parking_slot_id.isnot(None)).count() > limit:
+            return (
+                jsonify(
+                    {
+                        "error": f"A single PDF is limited to {limit} tickets; "
+                        "use format=zip for larger exports"
+                    }
+                ),
+                400,
+            )
+        return send_file(
+            BytesIO(render_tickets_pdf(iter_ticket_snapshots(query))),
+            mimetype="application/pdf",
+            as_attachment=True,
+            download_name="parking_tickets.pdf",
+        )
+
+    if export_format != "zip":
+        return jsonify({"error": "Invalid format, use zip or pdf"}), 400
+
+    response = Response(
+        stream_with_context(stream_tickets_zip(iter_ticket_snapshots(query))),
+        mimetype="application/zip",
+    )
+    response.headers.set(
+        "Content-Disposition", "attachment", filename="parking_tickets.zip"
+    )
+    return response
+
+
+@event.listens_for(Booking, "after_update")
+@event.listens_for(Booking, "after_delete")
+def invalidate_ticket_artifacts(mapper, connection, booking):
+    """Drop cached tickets once an edit or deletion of a booking is committed."""
+    on_commit(booking, ticket_cache.invalidate, booking.id)
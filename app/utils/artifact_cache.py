@@ -0,0 +1,138 @@
+import glob
+import os
+import threading
+
+from app.utils.metrics import record_cache
+
+
+class ArtifactCache:
+    """
+    Size-bounded on-disk cache for rendered files (ticket QR codes and PDFs).
+
+    Files are stored as ``<owner id>-<content hash>.<ext>``: the hash covers
+    everything that is rendered, so a changed booking never hits a stale file,
+    and the owner prefix lets all artifacts of one booking be dropped at once.
+    Reads bump the file mtime and eviction removes the oldest files first, which
+    gives LRU behaviour shared by every worker using the same directory.
+    """
+
+    def __init__(self, app=None):
+        self.directory = None
+        self.max_bytes = 0
+        self._size = 0
+        self._ready = False
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.directory = app.config.get("TICKET_CACHE_DIR") or os.path.join(
+            app.instance_path, "ticket_cache"
+        )
+        self.max_bytes = app.config.get("TICKET_CACHE_MAX_BYTES", 200 * 1024 * 1024)
+        self._size = 0
+        self._ready = False
+        if not self.max_bytes:
+            self.directory = None
+
+    def _prepare(self):
+        """Create and size the directory on first write instead of at startup."""
+        with self._lock:
+            if not self._ready and self.directory is not None:
+                try:
+                    os.makedirs(self.directory, exist_ok=True)
+                    self._size = sum(os.path.getsize(path) for path in self._files())
+                except OSError:
+                    # e.g. a read-only filesystem: run without the cache
+                    self.directory = None
+                self._ready = True
+        return self.enabled
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    def _path(self, owner_id, key, ext):
+        return os.path.join(self.directory, f"{owner_id}-{key}.{ext}")
+
+    def _files(self):
+        return glob.glob(os.path.join(self.directory, "*-*.*"))
+
+    def get(self, owner_id, key, ext):
+        """Return the cached bytes, or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self._path(owner_id, key, ext)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            record_cache(f"ticket_{ext}", False)
+            return None
+        record_cache(f"ticket_{ext}", True)
+        return data
+
+    def contains(self, owner_id, key, ext):
+        """Whether the artifact is cached, without reading it."""
+        return self.enabled and os.path.exists(self._path(owner_id, key, ext))
+
+    def put(self, owner_id, key, ext, data):
+        """Store rendered bytes atomically and evict old files if over budget."""
+        if not self.enabled or not self._prepare():
+            return
+        path = self._path(owner_id, key, ext)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            self._size += len(data) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def invalidate(self, owner_id):
+        """Remove every artifact rendered for ``owner_id``."""
+        if not self.enabled or not self._prepare():
+            return
+        for path in glob.glob(os.path.join(self.directory, f"{owner_id}-*.*")):
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                continue
+            with self._lock:
+                self._size -= size
+
+    def _evict(self):
+        """Delete least recently used files until the cache is at 90% of its budget."""
+        entries = []
+        for path in self._files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        # Other workers share the directory, so resync the size from disk
+        self._size = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+
+
+ticket_cache = ArtifactCache()
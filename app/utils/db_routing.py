@@ -0,0 +1,121 @@
+"""
+Connection pool settings and read-replica routing.
+
+Views decorated with ``read_replica`` send their plain SELECTs to the
+``replica`` bind (configured with DATABASE_REPLICA_URL); writes, locking
+reads and everything else go to the primary. After a request commits changes
+of its own, the user's next requests read from the primary for
+``REPLICA_STICKY_SECONDS`` so they see their writes despite replication lag.
+"""
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+REPLICA_BIND = "replica"
+STICKY_SESSION_KEY = "_db_primary_until"
+
+
+def engine_options(config, url):
+    """Pool settings for an engine, from the DB_POOL_* settings."""
+    options = {
+        "pool_pre_ping": config.get("DB_POOL_PRE_PING", True),
+        "pool_recycle": config.get("DB_POOL_RECYCLE_SECONDS", 1800),
+    }
+    # SQLite engines are not pooled per connection count
+    if not url.startswith("sqlite"):
+        options.update(
+            pool_size=config.get("DB_POOL_SIZE", 10),
+            max_overflow=config.get("DB_MAX_OVERFLOW", 20),
+            pool_timeout=config.get("DB_POOL_TIMEOUT_SECONDS", 30),
+        )
+    return options
+
+
+def configure_database(app):
+    """Set engine options and the replica bind before ``db.init_app``."""
+    config = app.config
+    config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        **engine_options(config, config["SQLALCHEMY_DATABASE_URI"]),
+        **config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+    }
+    replica_url = config.get("DATABASE_REPLICA_URL")
+    if replica_url:
+        binds = dict(config.get("SQLALCHEMY_BINDS") or {})
+        binds.setdefault(
+            REPLICA_BIND, {"url": replica_url, **engine_options(config, replica_url)}
+        )
+        config["SQLALCHEMY_BINDS"] = binds
+
+
+def _replica_allowed():
+    return has_request_context() and g.get("use_replica", False)
+
+
+class RoutingSession(Session):
+    """``db.session`` class that sends plain reads to the replica when allowed."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not self.info.get("flushed")
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+            and _replica_allowed()
+        ):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _remember_flush(db_session, flush_context):
+    # Reads later in this transaction must see what was just written
+    db_session.info["flushed"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _stick_to_primary(db_session):
+    if not db_session.info.pop("flushed", False) or not has_request_context():
+        return
+    if REPLICA_BIND not in (current_app.config.get("SQLALCHEMY_BINDS") or {}):
+        return
+    session[STICKY_SESSION_KEY] = time.time() + current_app.config.get(
+        "REPLICA_STICKY_SECONDS", 5
+    )
+    g.use_replica = False
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_flush(db_session):
+    db_session.info.pop("flushed", None)
+
+
+def read_replica(view):
+    """Route the view's reads to the replica, unless the user just wrote."""
+
+    @wraps(view)
+    def decorated(*args, **kwargs):
+        g.use_replica = session.get(STICKY_SESSION_KEY, 0) < time.time()
+        return view(*args, **kwargs)
+
+    return decorated
+
+
+@contextmanager
+def on_primary():
+    """Read from the primary inside the block, e.g. to decide what to write."""
+    previous = g.get("use_replica", False) if has_request_context() else None
+    if previous:
+        g.use_replica = False
+    try:
+        yield
+    finally:
+        if previous:
+            g.use_replica = previous
@@ -1,35 +1,13 @@
 from flask import current_app, render_template
 from flask_mail import Message
-from threading import Thread
-from app import mail
+from app.utils.email_dispatcher import email_dispatcher
+from app.utils.email_outbox import enqueue_email, render_email
 import logging
 from datetime import datetime
 
-def send_async_email(app, msg):
-    """Send email asynchronously."""
-    with app.app_context():
-        try:
-            app.logger.info(f"Attempting to send email to {msg.recipients}")
-            mail.send(msg)
-            app.logger.info(f"Email successfully sent to {msg.recipients}")
-        except Exception as e:
-            app.logger.error(f"Error sending email: {str(e)}")
-            # Log more detailed information for debugging
-            app.logger.error(f"Mail config: MAIL_SERVER={app.config.get('MAIL_SERVER')}, "
-                           f"MAIL_PORT={app.config.get('MAIL_PORT')}, "
-                           f"MAIL_USE_TLS={app.config.get('MAIL_USE_TLS')}, "
-                           f"MAIL_USERNAME={app.config.get('MAIL_USERNAME')}")
-
 def send_email(subject, recipients, text_body, html_body=None, sender=None):
     """Send an email."""
     app = current_app._get_current_object()
-    msg = Message(
-        subject=subject,
-        recipients=recipients,
-        body=text_body,
-        html=html_body,
-        sender=sender or current_app.config.get('MAIL_DEFAULT_SENDER')
-    )
     # Log message details for debugging
     app.logger.info(f"Preparing to send email to {recipients}")
     app.logger.info(f"Subject: {subject}")
@@ -39,8 +17,35 @@ def send_email(subject, recipients, text_body, html_body=None, sender=None):
         # Don't send emails in testing mode
         return
     
-    # Send email in a background thread to avoid blocking
-    Thread(target=send_async_email, args=(app, msg)).start()
+    if current_app.config.get('EMAIL_BACKEND') == 'pool':
+        # Hand the message to the in-process email worker pool
+        email_dispatcher.submit(Message(
+            subject=subject,
+            recipients=recipients,
+            body=text_body,
+            html=html_body,
+            sender=sender or current_app.config.get('MAIL_DEFAULT_SENDER')
+        ))
+    else:
+        # Durable outbox, delivered by `flask send-emails`
+        enqueue_email(subject, recipients, sender=sender,
+                      text_body=text_body, html_body=html_body)
+
+def send_templated_email(subject, recipients, template, **context):
+    """
+    Send an email rendered from email templates ``<template>.txt/.html``.
+    With the outbox backend rendering happens in the sender process, so the
+    context must be JSON-serializable (pass user_id instead of a user).
+    """
+    if current_app.config.get('TESTING', False):
+        return
+    
+    if current_app.config.get('EMAIL_BACKEND') == 'pool':
+        text_body, html_body = render_email(template, context)
+        send_email(subject, recipients, text_body, html_body)
+    else:
+        current_app.logger.info(f"Queueing '{template}' email to {recipients}")
+        enqueue_email(subject, recipients, template=template, context=context)
 
 def send_verification_email(user, token):
     """Send an email verification link to the user."""
@@ -52,19 +57,12 @@ def send_verification_email(user, token):
     
     subject = 'Verify Your Email - Smart Parking System'
     
-    send_email(
+    send_templated_email(
         subject=subject,
         recipients=[user.email],
-        text_body=render_template(
-            'email/verify/email.txt',
-            user=user,
-            verification_url=verification_url
-        ),
-        html_body=render_template(
-            'email/verify/email.html',
-            user=user,
-            verification_url=verification_url
-        )
+        template='email/verify/email',
+        user_id=user.id,
+        verification_url=verification_url
     )
 
 def send_password_reset_email(user, token):
@@ -77,19 +75,12 @@ def send_password_reset_email(user, token):
     
     subject = 'Reset Your Password - Smart Parking System'
     
-    send_email(
+    send_templated_email(
         subject=subject,
         recipients=[user.email],
-        text_body=render_template(
-            'email/reset/email.txt',
-            user=user,
-            reset_url=reset_url
-        ),
-        html_body=render_template(
-            'email/reset/email.html',
-            user=user,
-            reset_url=reset_url
-        )
+        template='email/reset/email',
+        user_id=user.id,
+        reset_url=reset_url
     )
 def send_booking_confirmation(user, booking):
     """Send a booking confirmation email to the user."""
@@ -0,0 +1,189 @@
+import atexit
+import queue
+import smtplib
+import threading
+import time
+
+from app.extensions import mail
+from app.utils.metrics import EMAIL_QUEUE_DEPTH
+
+# Put on the queue once per worker to make it exit after draining
+_STOP = object()
+
+
+def send_on(connection, msg):
+    """
+    Send ``msg`` over a kept-alive Flask-Mail connection, opening one if needed.
+
+    Returns the connection to reuse for the next message. If the server has
+    dropped a reused connection it reconnects once; other errors propagate
+    (with the connection already closed).
+    """
+    reused = connection is not None
+    try:
+        if connection is None:
+            connection = mail.connect().__enter__()
+        connection.send(msg)
+        return connection
+    except smtplib.SMTPServerDisconnected:
+        close_connection(connection)
+        if not reused:
+            raise
+        return send_on(None, msg)
+    except Exception:
+        close_connection(connection)
+        raise
+
+
+def close_connection(connection):
+    """Politely close a connection from send_on; always returns None."""
+    if connection is not None and connection.host is not None:
+        try:
+            connection.host.quit()
+        except Exception:
+            connection.host.close()
+    return None
+
+
+class EmailDispatcher:
+    """
+    Fixed pool of email worker threads fed by a bounded queue.
+
+    Each worker keeps one SMTP connection open and reuses it for every message
+    it sends, collecting up to ``batch_size`` queued messages per wake-up. A
+    connection idle for longer than ``idle_timeout`` is closed; a failed send
+    drops the connection and is retried with exponential backoff. Workers are
+    started lazily on the first message (so pre-forking servers start them in
+    each worker process) and ``shutdown`` drains the queue before returning.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.workers = 0
+        self.batch_size = 20
+        self.max_retries = 3
+        self.retry_backoff = 2.0
+        self.idle_timeout = 30
+        self.enqueue_timeout = 1.0
+        self._queue = None
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = app.config.get("EMAIL_WORKERS", 2)
+        self.batch_size = app.config.get("EMAIL_BATCH_SIZE", 20)
+        self.max_retries = app.config.get("EMAIL_MAX_RETRIES", 3)
+        self.retry_backoff = app.config.get("EMAIL_RETRY_BACKOFF_SECONDS", 2.0)
+        self.idle_timeout = app.config.get("EMAIL_CONNECTION_IDLE_SECONDS", 30)
+        self.enqueue_timeout = app.config.get("EMAIL_ENQUEUE_TIMEOUT_SECONDS", 1.0)
+        self._queue = queue.Queue(maxsize=app.config.get("EMAIL_QUEUE_SIZE", 1000))
+
+    def _start(self):
+        with self._lock:
+            if self._threads or self._stopping.is_set():
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"email-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            atexit.register(self.shutdown)
+
+    def submit(self, msg):
+        """Queue a message; returns False if the queue stayed full or is closed."""
+        if self._stopping.is_set():
+            return False
+        if not self.workers:
+            close_connection(self._send(None, msg))
+            return True
+        if not self._threads:
+            self._start()
+        try:
+            self._queue.put(msg, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self.app.logger.error(f"Email queue full, dropping email to {msg.recipients}")
+            return False
+        EMAIL_QUEUE_DEPTH.inc()
+        return True
+
+    def _next_batch(self):
+        """Block for one message, then take whatever else is queued up to batch_size."""
+        try:
+            first = self._queue.get(timeout=self.idle_timeout)
+        except queue.Empty:
+            return None
+        batch = [first]
+        while len(batch) < self.batch_size and batch[-1] is not _STOP:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        with self.app.app_context():
+            connection = None
+            try:
+                while True:
+                    batch = self._next_batch()
+                    if batch is None:
+                        # Idle: let the SMTP server have its connection back
+                        connection = close_connection(connection)
+                        continue
+                    stop = batch[-1] is _STOP
+                    messages = batch[:-1] if stop else batch
+                    for msg in messages:
+                        connection = self._send(connection, msg)
+                        EMAIL_QUEUE_DEPTH.dec()
+                    if stop:
+                        return
+            finally:
+                close_connection(connection)
+
+    def _send(self, connection, msg):
+        """Send one message, backing off and retrying on failure."""
+        attempt = 0
+        while attempt is not None:
+            try:
+                connection = send_on(connection, msg)
+                self.app.logger.info(f"Email successfully sent to {msg.recipients}")
+                return connection
+            except smtplib.SMTPRecipientsRefused as e:
+                self.app.logger.error(f"Email to {msg.recipients} refused: {e}")
+                return None
+            except Exception as e:
+                connection = None
+                attempt = self._backoff(attempt, msg, e)
+        return connection
+
+    def _backoff(self, attempt, msg, error):
+        """Sleep before the next attempt; returns None when retries are used up."""
+        if attempt >= self.max_retries:
+            self.app.logger.error(
+                f"Giving up on email to {msg.recipients} after {attempt + 1} attempts: {error}"
+            )
+            return None
+        delay = self.retry_backoff * 2**attempt
+        self.app.logger.warning(
+            f"Error sending email to {msg.recipients} ({error}), retrying in {delay:.1f}s"
+        )
+        time.sleep(delay)
+        return attempt + 1
+
+    def shutdown(self, timeout=30):
+        """Stop accepting email, send everything queued and stop the workers."""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        self._threads = []
+
+
+email_dispatcher = EmailDispatcher()
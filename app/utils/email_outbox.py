@@ -0,0 +1,218 @@
+import os
+import signal
+import socket
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, render_template
+from flask_mail import Message
+from jinja2 import TemplateNotFound
+from sqlalchemy import and_, insert, or_
+
+from app.extensions import db
+from app.models.email_outbox import EmailOutbox
+from app.utils.email_dispatcher import close_connection, send_on
+from app.utils.metrics import EMAIL_OUTBOX_EMAILS
+
+
+def enqueue_email(
+    subject, recipients, sender=None, text_body=None, html_body=None, template=None, context=None
+):
+    """
+    Store an email in the outbox; this is one INSERT and nothing else. The row
+    is committed together with the rest of the caller's transaction.
+    """
+    db.session.execute(
+        insert(EmailOutbox),
+        {
+            "subject": subject,
+            "recipients": list(recipients),
+            "sender": sender,
+            "text_body": text_body,
+            "html_body": html_body,
+            "template": template,
+            "context": context,
+        },
+    )
+
+
+def render_email(template, context):
+    """
+    Render ``<template>.txt`` (and ``<template>.html`` if present).
+    A ``user_id`` in the context is loaded and passed to the templates as ``user``.
+    """
+    context = dict(context or {})
+    user_id = context.pop("user_id", None)
+    if user_id is not None:
+        from app.models.user import User
+
+        context["user"] = db.session.get(User, user_id)
+
+    text_body = render_template(f"{template}.txt", **context)
+    try:
+        html_body = render_template(f"{template}.html", **context)
+    except TemplateNotFound:
+        html_body = None
+    return text_body, html_body
+
+
+class OutboxSender:
+    """
+    Sends outbox rows in batches over one kept-alive SMTP connection.
+
+    Rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` so several
+    senders can run side by side. A claim older than ``claim_timeout`` (the
+    sender died mid-batch) is picked up again, so delivery is at least once.
+    Failed rows are retried with exponential backoff until ``max_retries``,
+    then marked failed.
+    """
+
+    def __init__(self, app, batch_size=None):
+        self.app = app
+        self.batch_size = batch_size or app.config.get("EMAIL_OUTBOX_BATCH_SIZE", 50)
+        self.poll_interval = app.config.get("EMAIL_OUTBOX_POLL_SECONDS", 2)
+        self.claim_timeout = app.config.get("EMAIL_OUTBOX_CLAIM_TIMEOUT_SECONDS", 300)
+        self.idle_timeout = app.config.get("EMAIL_CONNECTION_IDLE_SECONDS", 30)
+        self.max_retries = app.config.get("EMAIL_MAX_RETRIES", 3)
+        self.retry_backoff = app.config.get("EMAIL_RETRY_BACKOFF_SECONDS", 2.0)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.connection = None
+        self._stopping = False
+
+    def claim(self):
+        """Mark the next batch of due rows as ours and return them."""
+        now = datetime.utcnow()
+        ids = [
+            row.id
+            for row in db.session.query(EmailOutbox.id)
+            .filter(
+                or_(
+                    and_(EmailOutbox.status == "pending", EmailOutbox.available_at <= now),
+                    and_(
+                        EmailOutbox.status == "sending",
+                        EmailOutbox.claimed_at < now - timedelta(seconds=self.claim_timeout),
+                    ),
+                )
+            )
+            .order_by(EmailOutbox.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        ]
+        if ids:
+            EmailOutbox.query.filter(EmailOutbox.id.in_(ids)).update(
+                {"status": "sending", "claimed_at": now, "claimed_by": self.worker_id},
+                synchronize_session=False,
+            )
+        db.session.commit()
+        if not ids:
+            return []
+        return EmailOutbox.query.filter(EmailOutbox.id.in_(ids)).order_by(EmailOutbox.id).all()
+
+    def _message(self, row):
+        text_body, html_body = row.text_body, row.html_body
+        if row.template:
+            text_body, html_body = render_email(row.template, row.context)
+        return Message(
+            subject=row.subject,
+            recipients=row.recipients,
+            body=text_body,
+            html=html_body,
+            sender=row.sender or self.app.config.get("MAIL_DEFAULT_SENDER"),
+        )
+
+    def _failed(self, row, error):
+        row.attempts += 1
+        row.last_error = str(error)[:1000]
+        row.claimed_by = None
+        if row.attempts > self.max_retries:
+            row.status = "failed"
+            self.app.logger.error(
+                f"Giving up on outbox email #{row.id} to {row.recipients}: {error}"
+            )
+        else:
+            row.status = "pending"
+            row.available_at = datetime.utcnow() + timedelta(
+                seconds=self.retry_backoff * 2 ** (row.attempts - 1)
+            )
+            self.app.logger.warning(
+                f"Error sending outbox email #{row.id} ({error}), will retry"
+            )
+
+    def send_batch(self, rows):
+        """Render and send claimed rows, then record the outcome."""
+        sent_ids = []
+        for row in rows:
+            try:
+                msg = self._message(row)
+            except Exception as e:
+                self._failed(row, e)
+                continue
+            try:
+                self.connection = send_on(self.connection, msg)
+            except Exception as e:
+                # send_on has already closed the connection
+                self.connection = None
+                self._failed(row, e)
+                continue
+            sent_ids.append(row.id)
+
+        if sent_ids:
+            EmailOutbox.query.filter(EmailOutbox.id.in_(sent_ids)).update(
+                {"status": "sent", "sent_at": datetime.utcnow(), "last_error": None},
+                synchronize_session=False,
+            )
+        db.session.commit()
+        return len(sent_ids)
+
+    def stop(self, *args):
+        self._stopping = True
+
+    def run(self, once=False):
+        """Send due emails until stopped (or until nothing is due, with ``once``)."""
+        signal.signal(signal.SIGTERM, self.stop)
+        idle_since = time.monotonic()
+        total = 0
+        try:
+            while not self._stopping:
+                rows = self.claim()
+                if rows:
+                    total += self.send_batch(rows)
+                    idle_since = time.monotonic()
+                    continue
+                if once:
+                    break
+                if time.monotonic() - idle_since > self.idle_timeout:
+                    self.connection = close_connection(self.connection)
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.connection = close_connection(self.connection)
+        return total
+
+
+def outbox_counts():
+    """Unsent outbox rows per status, for the email_outbox_emails gauge."""
+    statuses = ("pending", "sending", "failed")
+    rows = (
+        db.session.query(EmailOutbox.status, db.func.count(EmailOutbox.id))
+        .filter(EmailOutbox.status.in_(statuses))
+        .group_by(EmailOutbox.status)
+    )
+    counts = dict.fromkeys(statuses, 0)
+    counts.update(rows)
+    return {(status,): count for status, count in counts.items()}
+
+
+def register_email_outbox(app):
+    if app.config.get("EMAIL_BACKEND") == "outbox":
+        EMAIL_OUTBOX_EMAILS.source = outbox_counts
+
+    @app.cli.command("send-emails")
+    @click.option("--once", is_flag=True, help="Send everything that is due, then exit.")
+    @click.option("--batch-size", type=int, default=None, help="Rows claimed per batch.")
+    def send_emails_command(once, batch_size):
+        """Send queued emails from the outbox."""
+        sent = OutboxSender(current_app._get_current_object(), batch_size).run(once=once)
+        click.echo(f"Sent {sent} emails")
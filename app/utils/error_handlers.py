@@ -21,6 +21,12 @@ def register_error_handlers(app):
             return jsonify({"error": "Internal server error"}), 500
         return render_template('errors/500.html'), 500
     
+    @app.errorhandler(409)
+    def conflict_error(error):
+        if request.path.startswith('/api/'):
+            return jsonify({"error": "Conflict"}), 409
+        return render_template('errors/409.html'), 409
+    
     @app.errorhandler(400)
     def bad_request_error(error):
         if request.path.startswith('/api/'):
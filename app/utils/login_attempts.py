@@ -0,0 +1,223 @@
+import atexit
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, func, or_, update
+
+from app.extensions import db
+
+
+class LoginAttemptStore:
+    """
+    Failed-login counters, lockouts and last-login times, written to the users
+    table in batches.
+
+    Logins do not commit the user row. What happened since the last flush is
+    buffered per user as a delta (failures to add, or a reset), and a
+    background thread applies all deltas every ``flush_interval`` seconds with
+    atomic UPDATEs: ``login_attempts = login_attempts + n``, then a lock on
+    every row that reached ``max_attempts``. Workers therefore add up their
+    failures in the database instead of overwriting each other's counts.
+
+    Whether an account is locked is decided from the user row the login just
+    loaded plus this process's unflushed failures, so a lock written by any
+    worker applies everywhere after at most one flush interval. The rules are
+    unchanged: ``max_attempts`` failures lock the account for ``lockout``, an
+    expired lock resets the counter and a successful login clears both.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.max_attempts = 5
+        self.lockout = timedelta(minutes=30)
+        self.flush_interval = 2
+        # user id -> {"reset": None | "success" | "expired", "last_login",
+        #             "failures", "last_failure", "locked_until"}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        self.app = app
+        self.max_attempts = app.config.get("LOGIN_MAX_ATTEMPTS", 5)
+        self.lockout = timedelta(minutes=app.config.get("LOGIN_LOCKOUT_MINUTES", 30))
+        self.flush_interval = app.config.get("LOGIN_STATE_FLUSH_SECONDS", 2)
+
+    def _entry(self, user_id):
+        entry = self._pending.get(user_id)
+        if entry is None:
+            entry = self._pending[user_id] = {
+                "reset": None,
+                "last_login": None,
+                "failures": 0,
+                "last_failure": None,
+                "locked_until": None,
+            }
+        if self._thread is None:
+            self._start()
+        return entry
+
+    def record(self, user, successful):
+        """Count a login attempt, locking the account after too many failures."""
+        now = datetime.utcnow()
+        with self._lock:
+            entry = self._entry(user.id)
+            if successful:
+                entry.update(reset="success", last_login=now, failures=0, locked_until=None)
+                return
+
+            entry["failures"] += 1
+            entry["last_failure"] = now
+            # A pending reset means the row's counter is already void
+            attempts = entry["failures"] + (0 if entry["reset"] else user.login_attempts or 0)
+            if attempts >= self.max_attempts:
+                entry["locked_until"] = now + self.lockout
+                # Flushing bypasses the ORM, so drop the cached login user here
+                from app.models.user import user_cache
+
+                user_cache.invalidate(user.id)
+
+    def is_locked(self, user):
+        """Check if the account is currently locked."""
+        now = datetime.utcnow()
+        with self._lock:
+            entry = self._pending.get(user.id)
+            stored = None if entry and entry["reset"] == "success" else user.locked_until
+            local = entry["locked_until"] if entry else None
+            locked_until = max(filter(None, (stored, local)), default=None)
+            if not locked_until:
+                return False
+            if locked_until > now:
+                return True
+            # Reset if lock has expired
+            entry = self._entry(user.id)
+            if entry["reset"] is None:
+                entry["reset"] = "expired"
+            entry.update(failures=0, locked_until=None)
+            return False
+
+    def forget(self, user_id):
+        """Drop buffered changes after the row was reset directly."""
+        with self._lock:
+            self._pending.pop(user_id, None)
+
+    def _merge_back(self, pending):
+        """Put deltas whose flush failed back in front of newer ones."""
+        for user_id, old in pending.items():
+            new = self._pending.get(user_id)
+            if new is None:
+                self._pending[user_id] = old
+            elif new["reset"] is None:
+                new["failures"] += old["failures"]
+                new["last_failure"] = new["last_failure"] or old["last_failure"]
+                new["reset"], new["last_login"] = old["reset"], old["last_login"]
+                new["locked_until"] = new["locked_until"] or old["locked_until"]
+
+    def flush(self):
+        """Apply all buffered deltas to the database in one transaction."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        from app.models.user import User
+
+        users = User.__table__
+        now = datetime.utcnow()
+        by_id = users.c.id == bindparam("user_id")
+        successes = [
+            {"user_id": user_id, "last_login": entry["last_login"]}
+            for user_id, entry in pending.items()
+            if entry["reset"] == "success"
+        ]
+        expired = [
+            {"user_id": user_id}
+            for user_id, entry in pending.items()
+            if entry["reset"] == "expired"
+        ]
+        failures = [
+            {
+                "user_id": user_id,
+                "failures": entry["failures"],
+                "lock_until": entry["last_failure"] + self.lockout,
+            }
+            for user_id, entry in pending.items()
+            if entry["failures"]
+        ]
+
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as conn:
+                    # Resets happened before the failures buffered after them
+                    if successes:
+                        conn.execute(
+                            update(users)
+                            .where(by_id)
+                            .values(
+                                login_attempts=0,
+                                locked_until=None,
+                                last_login=bindparam("last_login"),
+                            ),
+                            successes,
+                        )
+                    if expired:
+                        # Leave a lock another worker has set again meanwhile
+                        conn.execute(
+                            update(users)
+                            .where(by_id, users.c.locked_until <= now)
+                            .values(login_attempts=0, locked_until=None),
+                            expired,
+                        )
+                    if failures:
+                        conn.execute(
+                            update(users)
+                            .where(by_id)
+                            .values(
+                                login_attempts=func.coalesce(users.c.login_attempts, 0)
+                                + bindparam("failures")
+                            ),
+                            failures,
+                        )
+                        conn.execute(
+                            update(users)
+                            .where(
+                                by_id,
+                                users.c.login_attempts >= self.max_attempts,
+                                or_(
+                                    users.c.locked_until.is_(None),
+                                    users.c.locked_until < bindparam("lock_until"),
+                                ),
+                            )
+                            .values(locked_until=bindparam("lock_until")),
+                            failures,
+                        )
+        except Exception:
+            with self._lock:
+                self._merge_back(pending)
+            raise
+        return len(pending)
+
+    def _start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="login-attempt-flusher", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.error(f"Error flushing login attempts: {e}")
+
+    def shutdown(self):
+        self._stop.set()
+        try:
+            self.flush()
+        except Exception as e:
+            self.app.logger.error(f"Error flushing login attempts on shutdown: {e}")
+
+
+login_attempts = LoginAttemptStore()
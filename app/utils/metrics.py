@@ -0,0 +1,292 @@
+import hmac
+import threading
+import time
+
+from flask import Response, abort, current_app, g, request
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Registry:
+    """
+    Metric storage with one accumulator dict per thread.
+
+    Recording only touches the calling thread's dict, so the hot path takes no
+    lock. The lock is taken when a thread records for the first time and when
+    /metrics merges all threads; stores of finished threads are folded into
+    ``_retired`` at that point so short-lived threads don't leak memory.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stores = []
+        self._retired = {}
+        self.metrics = []
+
+    def store(self):
+        try:
+            return self._local.store
+        except AttributeError:
+            store = self._local.store = {}
+            with self._lock:
+                self._stores.append((threading.current_thread(), store))
+            return store
+
+    def collect(self):
+        """Return a merged snapshot of every thread's values."""
+        with self._lock:
+            alive = []
+            for thread, store in self._stores:
+                if thread.is_alive():
+                    alive.append((thread, store))
+                else:
+                    _merge(self._retired, store)
+            self._stores = alive
+            merged = {}
+            _merge(merged, self._retired)
+            for _, store in alive:
+                _merge(merged, dict(store))
+        return merged
+
+
+def _merge(target, source):
+    for key, value in source.items():
+        if isinstance(value, list):
+            current = target.get(key)
+            if current is None:
+                target[key] = list(value)
+            else:
+                for i, v in enumerate(value):
+                    current[i] += v
+        else:
+            target[key] = target.get(key, 0) + value
+
+
+REGISTRY = _Registry()
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.metrics.append(self)
+
+    def _labels(self, labels):
+        return ",".join(f'{k}="{v}"' for k, v in zip(self.labelnames, labels))
+
+    def render(self, values):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for (name, labels), value in sorted(values.items(), key=lambda kv: kv[0][1]):
+            if name == self.name:
+                lines.extend(self._render_sample(labels, value))
+        return lines
+
+    def _render_sample(self, labels, value):
+        label_str = self._labels(labels)
+        return [f"{self.name}{{{label_str}}} {value}" if label_str else f"{self.name} {value}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing value."""
+
+    type = "counter"
+
+    def inc(self, *labels, amount=1):
+        store = REGISTRY.store()
+        key = (self.name, labels)
+        store[key] = store.get(key, 0) + amount
+
+
+class Gauge(Counter):
+    """Value that can go up and down; per-thread deltas sum to the current value."""
+
+    type = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class ScrapedGauge(_Metric):
+    """
+    Gauge read when /metrics is scraped: ``source`` returns ``{labels: value}``,
+    e.g. from the database, so every worker reports the same shared value.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.source = None
+
+    def render(self, values):
+        if self.source is None:
+            return []
+        try:
+            samples = self.source()
+        except Exception as e:
+            current_app.logger.error(f"Error reading {self.name} for /metrics: {e}")
+            return []
+        return super().render(
+            {(self.name, labels): value for labels, value in samples.items()}
+        )
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values (e.g. latencies in seconds)."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        store = REGISTRY.store()
+        key = (self.name, labels)
+        sample = store.get(key)
+        if sample is None:
+            # bucket counts (non-cumulative), then +Inf, sum and count
+            sample = store[key] = [0] * (len(self.buckets) + 3)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                sample[i] += 1
+                break
+        else:
+            sample[len(self.buckets)] += 1
+        sample[-2] += value
+        sample[-1] += 1
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def _render_sample(self, labels, value):
+        label_str = self._labels(labels)
+        prefix = label_str + "," if label_str else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), value):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        suffix = f"{{{label_str}}}" if label_str else ""
+        lines.append(f"{self.name}_sum{suffix} {value[-2]}")
+        lines.append(f"{self.name}_count{suffix} {value[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by blueprint and route.",
+    ["blueprint", "endpoint"],
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "Time spent in database queries per request.",
+    ["blueprint", "endpoint"],
+)
+REQUEST_QUERIES = Counter(
+    "http_request_db_queries_total",
+    "Database queries executed by requests.",
+    ["blueprint", "endpoint"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled."
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit/miss).", ["cache", "result"]
+)
+EXPIRY_JOB_DURATION = Histogram(
+    "booking_expiry_job_duration_seconds", "Duration of Booking.release_expired_slots runs."
+)
+EMAIL_QUEUE_DEPTH = Gauge(
+    "email_queue_depth",
+    "Emails waiting in this worker's in-process send pool (EMAIL_BACKEND=pool).",
+)
+EMAIL_OUTBOX_EMAILS = ScrapedGauge(
+    "email_outbox_emails",
+    "Emails in the outbox table not sent yet, by status (EMAIL_BACKEND=outbox).",
+    ["status"],
+)
+
+
+def record_cache(cache, hit):
+    """Count a cache lookup so /metrics can report hit ratios."""
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def render_metrics():
+    """Render all metrics in the Prometheus text exposition format."""
+    values = REGISTRY.collect()
+    lines = []
+    for metric in REGISTRY.metrics:
+        lines.extend(metric.render(values))
+    return "\n".join(lines) + "\n"
+
+
+def metrics_access_allowed(config):
+    """Scrapes must come from an allowed address or carry the METRICS_TOKEN bearer token."""
+    if request.remote_addr in (config.get("METRICS_ALLOWED_IPS") or []):
+        return True
+    token = config.get("METRICS_TOKEN")
+    supplied = request.headers.get("Authorization", "")
+    return bool(token) and hmac.compare_digest(supplied, f"Bearer {token}")
+
+
+def register_metrics(app):
+    """
+    Expose /metrics and record request latency, in-flight requests and, with
+    METRICS_DB_TIME, per-request DB time and query counts.
+
+    Values live in the memory of the process that recorded them: with several
+    gunicorn workers each scrape sees the worker that answered it, not a total.
+    """
+    if not app.config.get("METRICS_ENABLED", False):
+        return
+
+    # Timing every statement is only paid for when DB time is asked for
+    if app.config.get("METRICS_DB_TIME", False):
+        from app.utils.query_stats import install_query_listeners
+
+        install_query_listeners()
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+
+    @app.teardown_request
+    def record_request_metrics(exc=None):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return
+        REQUESTS_IN_FLIGHT.dec()
+        labels = (request.blueprint or "", request.endpoint or "unmatched")
+        REQUEST_LATENCY.observe(time.perf_counter() - start, *labels)
+
+        stats = g.get("query_stats")
+        if stats is not None:
+            REQUEST_DB_TIME.observe(stats["time"], *labels)
+            REQUEST_QUERIES.inc(*labels, amount=stats["count"])
+
+    def metrics():
+        if not metrics_access_allowed(app.config):
+            abort(403)
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+    app.add_url_rule("/metrics", "metrics", metrics)
@@ -0,0 +1,93 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import abort
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasher:
+    """
+    Runs password hashing on a small, bounded thread pool.
+
+    hashlib's pbkdf2 and scrypt release the GIL, so ``workers`` threads can
+    keep that many cores busy while request threads wait for their result; at
+    most ``workers + max_pending`` hashes are in flight, and a caller that
+    cannot get a slot within ``wait_timeout`` seconds gets a 503 instead of
+    piling more CPU work onto an overloaded process. The cost is the werkzeug
+    method string (e.g. ``pbkdf2:sha256:600000`` or ``scrypt:32768:8:1``);
+    hashes made with other parameters are reported by ``needs_rehash``.
+    """
+
+    def __init__(self):
+        self.method = "pbkdf2:sha256:600000"
+        self.workers = os.cpu_count() or 1
+        self.max_pending = 32
+        self.wait_timeout = 5.0
+        self._prefix = self.method
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.configure(
+            app.config.get("PASSWORD_HASH_METHOD", self.method),
+            workers=app.config.get("PASSWORD_HASH_WORKERS") or os.cpu_count() or 1,
+            max_pending=app.config.get("PASSWORD_HASH_MAX_PENDING", 32),
+            wait_timeout=app.config.get("PASSWORD_HASH_WAIT_SECONDS", 5.0),
+        )
+
+    def configure(self, method, workers=1, max_pending=32, wait_timeout=5.0):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self.method = method
+            self.workers = workers
+            self.max_pending = max_pending
+            self.wait_timeout = wait_timeout
+            self._prefix = self._method_prefix(method)
+            self._executor = None
+            self._slots = threading.BoundedSemaphore(workers + max_pending)
+
+    @staticmethod
+    def _method_prefix(method):
+        """The ``method`` part that hashes made with it start with."""
+        parts = method.split(":")
+        # Fully specified methods are the prefix as written
+        if (parts[0] == "pbkdf2" and len(parts) == 3) or (
+            parts[0] == "scrypt" and len(parts) == 4
+        ):
+            return method
+        # Short names ("scrypt", "pbkdf2:sha256") only show their default
+        # parameters once used: hash once here, at startup, not on a login
+        return generate_password_hash("", method).split("$", 1)[0]
+
+    def _run(self, fn, *args):
+        if self._executor is None:
+            # Created on first use so forked server workers get their own threads
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="password-hasher"
+                    )
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            abort(503)
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        """Hash a password with the configured method."""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        """Check a password against a stored hash (of any method)."""
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True if the hash was made with a different method or cost."""
+        return pwhash.split("$", 1)[0] != self._prefix
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,107 @@
+import re
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_IN_LIST_RE = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    """Normalize a SQL statement so repeated executions of one query compare equal."""
+    statement = _IN_LIST_RE.sub("(?)", statement)
+    statement = _NUMBER_RE.sub("?", statement)
+    return _SPACE_RE.sub(" ", statement).strip()
+
+
+# Callables run after every timed statement as
+# observer(conn, statement, parameters, executemany, elapsed)
+query_observers = []
+
+# Per-statement counts in g.query_stats are only kept for the N+1 detector
+track_statements = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_start_time", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+
+    for observer in query_observers:
+        observer(conn, statement, parameters, executemany, elapsed)
+
+    if not has_request_context():
+        return
+    stats = g.get("query_stats")
+    if stats is None:
+        stats = g.query_stats = {"count": 0, "time": 0.0, "statements": Counter()}
+    stats["count"] += 1
+    stats["time"] += elapsed
+    if track_statements:
+        stats["statements"][statement] += 1
+
+
+def install_query_listeners():
+    """Start timing every cursor execution."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def register_query_stats(app):
+    """
+    Record query count, DB time and repeated statements for every request.
+
+    Only enabled when QUERY_STATS_ENABLED is set; when it is off no engine
+    listeners are installed, so disabled instrumentation costs nothing.
+    """
+    global track_statements
+
+    if not app.config.get("QUERY_STATS_ENABLED", False):
+        return
+
+    track_statements = True
+    install_query_listeners()
+
+    threshold = app.config.get("QUERY_STATS_N_PLUS_ONE_THRESHOLD", 5)
+    add_header = app.config.get("QUERY_STATS_HEADER", True)
+
+    @app.after_request
+    def log_query_stats(response):
+        stats = g.get("query_stats")
+        if stats is None:
+            return response
+
+        repeated = Counter()
+        for statement, count in stats["statements"].items():
+            repeated[fingerprint(statement)] += count
+        suspects = [(fp, n) for fp, n in repeated.most_common() if n >= threshold]
+
+        db_ms = stats["time"] * 1000
+        summary = (
+            f"{request.method} {request.path} endpoint={request.endpoint} "
+            f"queries={stats['count']} db_ms={db_ms:.1f}"
+        )
+        if suspects:
+            app.logger.warning(
+                f"Query stats: {summary} n+1_suspects="
+                + "; ".join(f"{n}x {fp[:120]}" for fp, n in suspects)
+            )
+        else:
+            app.logger.info(f"Query stats: {summary}")
+
+        if add_header:
+            response.headers["Server-Timing"] = (
+                f'db;dur={db_ms:.1f};desc="{stats["count"]} queries"'
+            )
+            response.headers["X-DB-Query-Count"] = str(stats["count"])
+        return response
@@ -0,0 +1,98 @@
+"""
+Production serving: gunicorn with the app loaded once in the master process
+and warmed up before the workers are forked.
+"""
+import importlib
+import subprocess
+import sys
+
+import click
+from flask.cli import ScriptInfo
+from gunicorn.app.base import BaseApplication
+
+from app.extensions import db
+
+
+def warm_templates(app):
+    """Compile every HTML template into Jinja's cache."""
+    count = 0
+    for name in app.jinja_env.list_templates(filter_func=lambda n: n.endswith(".html")):
+        try:
+            app.jinja_env.get_template(name)
+            count += 1
+        except Exception as e:
+            app.logger.warning(f"Could not compile template {name}: {e}")
+    return count
+
+
+def warm_up(app):
+    """
+    Load what every worker would otherwise load on its first requests, so the
+    forked workers share it: compiled templates, today's per-location plate
+    index and the ticket rendering libraries. Database connections opened here
+    are closed again, they must not be shared with the workers.
+    """
+    from app.parking.plates import active_plates
+
+    templates = warm_templates(app)
+    with app.app_context():
+        try:
+            active_plates.reload()
+        except Exception as e:
+            app.logger.warning(f"Could not load the active plate index: {e}")
+        finally:
+            db.session.remove()
+            db.engine.dispose()
+    # Loaded lazily by app.parking.tickets; import them once here instead of in every worker
+    for name in ("fpdf", "qrcode"):
+        importlib.import_module(name)
+    return templates
+
+
+def warm_db_pool(app):
+    """Open the pool's connections up front instead of on the first requests."""
+    with app.app_context():
+        engine = db.engine
+        # A forked worker must not reuse connections from the master
+        engine.dispose(close=False)
+        size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+        connections = []
+        try:
+            for _ in range(size):
+                connections.append(engine.connect())
+        except Exception as e:
+            app.logger.warning(f"Could not warm the database pool: {e}")
+        finally:
+            for connection in connections:
+                connection.close()
+
+
+def start_email_sender():
+    """Start ``flask send-emails`` for the same app in a child process."""
+    command = [sys.executable, "-m", "flask"]
+    info = click.get_current_context().find_object(ScriptInfo)
+    if info is not None and info.app_import_path:
+        command += ["--app", info.app_import_path]
+    return subprocess.Popen(command + ["send-emails"])
+
+
+class GunicornServer(BaseApplication):
+    """Runs an already created app under gunicorn with ``preload_app``."""
+
+    def __init__(self, app, options):
+        self.application = app
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        self.cfg.set("preload_app", True)
+        self.cfg.set("post_fork", self.post_fork)
+
+    @staticmethod
+    def post_fork(server, worker):
+        warm_db_pool(server.app.application)
+
+    def load(self):
+        return self.application
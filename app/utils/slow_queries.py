@@ -0,0 +1,182 @@
+import os
+import threading
+import traceback
+from collections import OrderedDict, deque
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from flask import has_request_context, request
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from app.utils.query_stats import fingerprint, install_query_listeners, query_observers
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_UTILS_DIR = os.path.dirname(os.path.abspath(__file__))
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE")
+
+
+class SlowQueryLog:
+    """
+    Ring buffer of the most recent slow statements.
+
+    Recording a slow statement only appends to the buffer. EXPLAIN runs later,
+    when an admin opens the log, over a dedicated unpooled engine, so it never
+    holds up the request or takes a connection from the application pool.
+    Plans are cached per fingerprint, so a query that is slow on every request
+    is only explained once until it falls out of the cache.
+
+    Bound values are never kept, not even until the EXPLAIN: statements wait
+    with stand-in values of the same types (see ``placeholder_parameters``),
+    so a plan may differ from the one real values would get. Plans always come
+    from the primary database, also for statements that ran on the replica.
+    """
+
+    def __init__(self, threshold_ms=200, size=100, explain=True, database_url=None):
+        self.threshold = threshold_ms / 1000
+        self.explain_enabled = explain and bool(database_url)
+        self.database_url = database_url
+        self.entries = deque(maxlen=size)
+        self._plans = OrderedDict()
+        # fingerprint -> (statement, placeholder parameters) waiting to be explained
+        self._pending = OrderedDict()
+        self._cache_size = size
+        self._engine = None
+        self._lock = threading.Lock()
+
+    def __call__(self, conn, statement, parameters, executemany, elapsed):
+        if elapsed < self.threshold or conn.engine is self._engine:
+            return
+
+        fp = fingerprint(statement)
+        self.entries.append(
+            {
+                "time": datetime.now(),
+                "duration_ms": round(elapsed * 1000, 1),
+                "fingerprint": fp,
+                "params": parameter_shape(parameters, executemany),
+                "route": request.endpoint if has_request_context() else "-",
+                "caller": calling_code(),
+            }
+        )
+        if self._needs_plan(fp, statement, executemany):
+            with self._lock:
+                self._pending[fp] = (statement, placeholder_parameters(parameters))
+                if len(self._pending) > self._cache_size:
+                    self._pending.popitem(last=False)
+
+    def _needs_plan(self, fp, statement, executemany):
+        if not self.explain_enabled or executemany:
+            return False
+        if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+            return False
+        return fp not in self._plans and fp not in self._pending
+
+    def _explain_engine(self):
+        if self._engine is None:
+            self._engine = create_engine(self.database_url, poolclass=NullPool)
+        return self._engine
+
+    def explain_pending(self):
+        """Run EXPLAIN for the slow statements that have no plan yet."""
+        with self._lock:
+            pending = list(self._pending.items())
+            self._pending.clear()
+        if not pending:
+            return
+
+        engine = self._explain_engine()
+        prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+        plans = {}
+        try:
+            with engine.connect() as conn:
+                for fp, (statement, parameters) in pending:
+                    try:
+                        result = conn.exec_driver_sql(prefix + statement, parameters)
+                        plans[fp] = [" | ".join(str(v) for v in row) for row in result]
+                    except Exception as e:
+                        conn.rollback()
+                        plans[fp] = [f"EXPLAIN failed: {e}"]
+        except Exception as e:
+            plans = {fp: [f"EXPLAIN failed: {e}"] for fp, _ in pending}
+
+        with self._lock:
+            self._plans.update(plans)
+            while len(self._plans) > self._cache_size:
+                self._plans.popitem(last=False)
+
+    def recent(self):
+        """Return the buffered entries with their plans, newest first."""
+        self.explain_pending()
+        with self._lock:
+            plans = dict(self._plans)
+        return [
+            dict(entry, explain=plans.get(entry["fingerprint"]))
+            for entry in reversed(self.entries)
+        ]
+
+    def clear(self):
+        self.entries.clear()
+        with self._lock:
+            self._plans.clear()
+            self._pending.clear()
+
+
+def parameter_shape(parameters, executemany=False):
+    """Describe bound parameters by type only, so no user data is kept."""
+    if executemany and parameters and isinstance(parameters[0], (list, tuple, dict)):
+        return f"{len(parameters)} x {parameter_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + "}"
+    return "(" + ", ".join(type(v).__name__ for v in parameters or ()) + ")"
+
+
+_PLACEHOLDERS = {
+    bool: False,
+    int: 0,
+    float: 0.0,
+    Decimal: Decimal(0),
+    str: "",
+    bytes: b"",
+    datetime: datetime(2000, 1, 1),
+    date: date(2000, 1, 1),
+    time: time(0),
+}
+
+
+def placeholder_parameters(parameters):
+    """Replace bound values by fixed values of the same type, for EXPLAIN."""
+    if isinstance(parameters, dict):
+        return {k: _PLACEHOLDERS.get(type(v)) for k, v in parameters.items()}
+    return tuple(_PLACEHOLDERS.get(type(v)) for v in parameters or ())
+
+
+def calling_code():
+    """Return the innermost application frame (outside app/utils) that ran the query."""
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(_APP_DIR) and not filename.startswith(_UTILS_DIR):
+            return f"{os.path.relpath(filename, _APP_DIR)}:{frame.lineno} in {frame.name}"
+    return "-"
+
+
+slow_query_log = None
+
+
+def register_slow_query_log(app):
+    """Capture statements slower than SLOW_QUERY_THRESHOLD_MS into a ring buffer."""
+    global slow_query_log
+
+    if not app.config.get("SLOW_QUERY_LOG_ENABLED", False):
+        return
+
+    if slow_query_log in query_observers:
+        query_observers.remove(slow_query_log)
+    slow_query_log = SlowQueryLog(
+        threshold_ms=app.config.get("SLOW_QUERY_THRESHOLD_MS", 200),
+        size=app.config.get("SLOW_QUERY_LOG_SIZE", 100),
+        explain=app.config.get("SLOW_QUERY_EXPLAIN", True),
+        database_url=app.config.get("SQLALCHEMY_DATABASE_URI"),
+    )
+    query_observers.append(slow_query_log)
+    install_query_listeners()
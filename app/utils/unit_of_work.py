@@ -0,0 +1,108 @@
+"""
+Request-scoped unit of work. Model methods only change objects in the
+session; a view decorated with ``unit_of_work`` commits everything once when
+it returns, or rolls everything back if it raises.
+
+Bookings and parking slots are versioned (optimistic locking), so a commit
+fails with StaleDataError when another request or the expiry job changed one
+of the rows in the meantime. Work that can simply be redone runs through
+``retry_on_conflict``; a user's own edit is not redone blindly, the request
+is answered with 409 Conflict and the user reviews the current state instead.
+"""
+from functools import wraps
+
+from flask import abort, current_app, g
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.extensions import db
+
+
+def after_commit(fn, *args, **kwargs):
+    """Call ``fn`` once the current unit of work has been committed."""
+    g.setdefault("_after_commit_callbacks", []).append((fn, args, kwargs))
+
+
+def on_commit(obj, fn, *args):
+    """
+    Call ``fn`` when the session that ``obj`` belongs to commits.
+
+    For mapper events, which fire during a flush that may still be rolled
+    back: the call is dropped if the transaction rolls back instead. ``fn``
+    runs after the commit, when the session can no longer load anything, so
+    pass it plain values rather than expired ORM objects.
+    """
+    db_session = object_session(obj)
+    if db_session is None:
+        fn(*args)
+        return
+    db_session.info.setdefault("commit_callbacks", []).append((fn, args))
+
+
+# On Session itself, so sessions of background jobs run their callbacks too
+@event.listens_for(Session, "after_commit")
+def _run_commit_callbacks(db_session):
+    for fn, args in db_session.info.pop("commit_callbacks", ()):
+        fn(*args)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_commit_callbacks(db_session):
+    db_session.info.pop("commit_callbacks", None)
+
+
+def _has_changes(session):
+    # "flushed" is set by RoutingSession when changes were already flushed
+    return bool(
+        session.new or session.dirty or session.deleted or session.info.get("flushed")
+    )
+
+
+def retry_on_conflict(work, attempts=None, session=None):
+    """
+    Run ``work()`` and commit ``session`` (``db.session`` by default), starting
+    over when it hits a version conflict.
+
+    The rollback expires every object in the session, so each attempt re-reads
+    the rows it changes. If ``work`` changed nothing, nothing is committed.
+    Returns what ``work`` returned; the conflict is re-raised once
+    ``attempts`` (OPTIMISTIC_LOCK_RETRIES) are used up.
+    """
+    session = session or db.session
+    attempts = attempts or current_app.config.get("OPTIMISTIC_LOCK_RETRIES", 3)
+    for attempt in range(1, attempts + 1):
+        try:
+            result = work()
+            # Nothing changed: skip the COMMIT and the reloads it would cause
+            if _has_changes(session):
+                session.commit()
+            return result
+        except StaleDataError:
+            session.rollback()
+            if attempt == attempts:
+                raise
+            current_app.logger.info(f"Version conflict, retrying ({attempt}/{attempts})")
+
+
+def unit_of_work(view):
+    """Commit the view's changes in a single transaction at the end of the request."""
+
+    @wraps(view)
+    def decorated(*args, **kwargs):
+        g._after_commit_callbacks = []
+        try:
+            response = view(*args, **kwargs)
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            g.pop("_after_commit_callbacks")
+            abort(409)
+        except Exception:
+            db.session.rollback()
+            raise
+        for fn, fn_args, fn_kwargs in g.pop("_after_commit_callbacks"):
+            fn(*fn_args, **fn_kwargs)
+        return response
+
+    return decorated
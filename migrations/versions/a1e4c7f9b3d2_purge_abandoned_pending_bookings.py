@@ -0,0 +1,63 @@
+"""Purge abandoned pending bookings
+
+Unpaid bookings are now kept as drafts outside the bookings table and
+only confirmed bookings are inserted, so the ``pending`` rows left behind by the
+old flow can never be completed. They are deleted in batches (each committed
+on its own) so the hot bookings table is not locked for long. This cannot be
+undone; the downgrade is a no-op.
+
+Revision ID: a1e4c7f9b3d2
+Revises: f3a9d6b1c2e8
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+from sqlalchemy import inspect, text
+
+# revision identifiers, used by Alembic.
+revision = 'a1e4c7f9b3d2'
+down_revision = 'f3a9d6b1c2e8'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def table_exists(table_name):
+    """Check if a table exists in the database."""
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade():
+    conn = op.get_bind()
+    # Gate events only reference confirmed bookings, but never break their FK
+    referenced = (
+        " AND NOT EXISTS (SELECT 1 FROM gate_events WHERE gate_events.booking_id = bookings.id)"
+        if table_exists('gate_events') else ""
+    )
+    pending = "booking_status = 'pending'" + referenced
+    # Upper id bound of the next batch of pending rows
+    batch_end = text(
+        f"SELECT MAX(id) FROM (SELECT id FROM bookings WHERE {pending} AND id > :last_id "
+        "ORDER BY id LIMIT :batch_size) batch"
+    )
+    delete_batch = text(
+        f"DELETE FROM bookings WHERE {pending} AND id > :last_id AND id <= :end_id"
+    )
+
+    last_id = 0
+    with op.get_context().autocommit_block():
+        while True:
+            end_id = conn.execute(
+                batch_end, {"last_id": last_id, "batch_size": BATCH_SIZE}
+            ).scalar()
+            if end_id is None:
+                break
+            conn.execute(delete_batch, {"last_id": last_id, "end_id": end_id})
+            last_id = end_id
+
+
+def downgrade():
+    pass
@@ -0,0 +1,47 @@
+"""Add indexes for hot query predicates
+
+Revision ID: a7c2e91d4b30
+Revises: cleanup_schema
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'a7c2e91d4b30'
+down_revision = 'cleanup_schema'
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns)
+INDEXES = [
+    ('ix_parking_slots_location_type_available', 'parking_slots',
+     ['parking_location_id', 'vehicle_type', 'is_available']),
+    ('ix_bookings_user_created', 'bookings', ['user_id', 'created_at']),
+    ('ix_bookings_status_slot', 'bookings', ['booking_status', 'parking_slot_id']),
+    ('ix_bookings_payment_created', 'bookings', ['payment_status', 'created_at']),
+    ('ix_users_verification_token', 'users', ['verification_token']),
+    ('ix_users_reset_password_token', 'users', ['reset_password_token']),
+]
+
+
+def index_exists(table_name, index_name):
+    """Check if an index exists on a table (db.create_all may have made it already)."""
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    return index_name in [ix['name'] for ix in inspector.get_indexes(table_name)]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        if not index_exists(table, name):
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        if index_exists(table, name):
+            op.drop_index(name, table_name=table)
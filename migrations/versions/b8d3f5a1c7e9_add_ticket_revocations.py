@@ -0,0 +1,43 @@
+"""Add ticket_revocations table for tickets of deleted bookings
+
+Revision ID: b8d3f5a1c7e9
+Revises: a1e4c7f9b3d2
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'b8d3f5a1c7e9'
+down_revision = 'a1e4c7f9b3d2'
+branch_labels = None
+depends_on = None
+
+
+def table_exists(table_name):
+    """Check if a table exists in the database."""
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade():
+    if table_exists('ticket_revocations'):
+        return
+    op.create_table(
+        'ticket_revocations',
+        sa.Column('booking_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('booking_date', sa.Date(), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('booking_id')
+    )
+    op.create_index('ix_ticket_revocations_booking_date', 'ticket_revocations',
+                    ['booking_date'], unique=False)
+
+
+def downgrade():
+    if table_exists('ticket_revocations'):
+        op.drop_index('ix_ticket_revocations_booking_date', table_name='ticket_revocations')
+        op.drop_table('ticket_revocations')
@@ -0,0 +1,51 @@
+"""Add gate_events table for barrier entry/exit events
+
+Revision ID: c4d81f2a6e57
+Revises: a7c2e91d4b30
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'c4d81f2a6e57'
+down_revision = 'a7c2e91d4b30'
+branch_labels = None
+depends_on = None
+
+
+def table_exists(table_name):
+    """Check if a table exists in the database."""
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade():
+    if table_exists('gate_events'):
+        return
+    op.create_table(
+        'gate_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.String(length=64), nullable=False),
+        sa.Column('booking_id', sa.Integer(), nullable=False),
+        sa.Column('parking_location_id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(length=10), nullable=False),
+        sa.Column('gate_id', sa.String(length=50), nullable=True),
+        sa.Column('occurred_at', sa.DateTime(), nullable=False),
+        sa.Column('received_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['booking_id'], ['bookings.id'], ),
+        sa.ForeignKeyConstraint(['parking_location_id'], ['parking_locations.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('event_id')
+    )
+    op.create_index('ix_gate_events_booking_occurred', 'gate_events',
+                    ['booking_id', 'occurred_at'], unique=False)
+
+
+def downgrade():
+    if table_exists('gate_events'):
+        op.drop_index('ix_gate_events_booking_occurred', table_name='gate_events')
+        op.drop_table('gate_events')
@@ -0,0 +1,56 @@
+"""Add booking_drafts table for unpaid bookings
+
+Revision ID: c6e2a9d4f1b7
+Revises: b8d3f5a1c7e9
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'c6e2a9d4f1b7'
+down_revision = 'b8d3f5a1c7e9'
+branch_labels = None
+depends_on = None
+
+
+def table_exists(table_name):
+    """Check if a table exists in the database."""
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade():
+    if table_exists('booking_drafts'):
+        return
+    op.create_table(
+        'booking_drafts',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('parking_location_id', sa.Integer(), nullable=False),
+        sa.Column('parking_slot_id', sa.Integer(), nullable=True),
+        sa.Column('vehicle_number', sa.String(length=20), nullable=False),
+        sa.Column('vehicle_type', sa.String(length=20), nullable=True),
+        sa.Column('booking_date', sa.Date(), nullable=False),
+        sa.Column('start_time', sa.Time(), nullable=False),
+        sa.Column('end_time', sa.Time(), nullable=False),
+        sa.Column('duration_hours', sa.Float(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['parking_location_id'], ['parking_locations.id'], ),
+        sa.ForeignKeyConstraint(['parking_slot_id'], ['parking_slots.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_booking_drafts_user_id', 'booking_drafts', ['user_id'], unique=False)
+    op.create_index('ix_booking_drafts_expires_at', 'booking_drafts', ['expires_at'], unique=False)
+
+
+def downgrade():
+    if table_exists('booking_drafts'):
+        op.drop_index('ix_booking_drafts_expires_at', table_name='booking_drafts')
+        op.drop_index('ix_booking_drafts_user_id', table_name='booking_drafts')
+        op.drop_table('booking_drafts')
@@ -0,0 +1,86 @@
+"""Add normalized, indexed vehicle_plate to bookings
+
+Revision ID: d2b7a3c91f08
+Revises: c4d81f2a6e57
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect, text
+
+# revision identifiers, used by Alembic.
+revision = 'd2b7a3c91f08'
+down_revision = 'c4d81f2a6e57'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def column_exists(table_name, column_name):
+    """Check if a column exists in a table."""
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    return column_name in [col['name'] for col in inspector.get_columns(table_name)]
+
+
+def index_exists(table_name, index_name):
+    """Check if an index exists on a table."""
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    return index_name in [ix['name'] for ix in inspector.get_indexes(table_name)]
+
+
+def normalize_plate(vehicle_number):
+    """
+    Copy of app.models.booking.normalize_plate as of this revision, so the
+    backfill does not change when the application code does.
+    """
+    return re.sub(r"[^A-Z0-9]", "", (vehicle_number or "").upper())
+
+
+def backfill_vehicle_plates():
+    """
+    Fill vehicle_plate with exactly what lookups compute (normalize_plate), in
+    keyset batches so the table is never rewritten in one statement.
+    """
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text(
+                "SELECT id, vehicle_number FROM bookings "
+                "WHERE vehicle_plate IS NULL AND id > :last_id ORDER BY id LIMIT :batch"
+            ),
+            {"last_id": last_id, "batch": BATCH_SIZE},
+        ).fetchall()
+        if not rows:
+            return
+        conn.execute(
+            text("UPDATE bookings SET vehicle_plate = :plate WHERE id = :id"),
+            [{"id": row.id, "plate": normalize_plate(row.vehicle_number)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    if not column_exists('bookings', 'vehicle_plate'):
+        op.add_column('bookings', sa.Column('vehicle_plate', sa.String(length=20), nullable=True))
+
+    backfill_vehicle_plates()
+    op.alter_column('bookings', 'vehicle_plate',
+                    existing_type=sa.String(length=20), nullable=False)
+
+    if not index_exists('bookings', 'ix_bookings_plate_date'):
+        op.create_index('ix_bookings_plate_date', 'bookings',
+                        ['vehicle_plate', 'booking_date'], unique=False)
+
+
+def downgrade():
+    if index_exists('bookings', 'ix_bookings_plate_date'):
+        op.drop_index('ix_bookings_plate_date', table_name='bookings')
+    if column_exists('bookings', 'vehicle_plate'):
+        op.drop_column('bookings', 'vehicle_plate')
@@ -0,0 +1,40 @@
+"""Add ticket_version to bookings
+
+Ticket tokens carried the optimistic locking ``version_id``, which changes on
+every update (also when the expiry job completes a booking), so a still valid
+ticket read as superseded. ``ticket_version`` only changes with the fields the
+token carries.
+
+Revision ID: d9f4b2c8e6a1
+Revises: c6e2a9d4f1b7
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'd9f4b2c8e6a1'
+down_revision = 'c6e2a9d4f1b7'
+branch_labels = None
+depends_on = None
+
+
+def column_exists(table_name, column_name):
+    """Check if a column exists in a table."""
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    return column_name in [col['name'] for col in inspector.get_columns(table_name)]
+
+
+def upgrade():
+    # Existing tickets start at version 1, as new ones do
+    if not column_exists('bookings', 'ticket_version'):
+        op.add_column('bookings', sa.Column('ticket_version', sa.Integer(),
+                                            nullable=False, server_default='1'))
+
+
+def downgrade():
+    if column_exists('bookings', 'ticket_version'):
+        op.drop_column('bookings', 'ticket_version')
@@ -0,0 +1,56 @@
+"""Add email_outbox table
+
+Revision ID: e5f1c8a2d7b4
+Revises: d2b7a3c91f08
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'e5f1c8a2d7b4'
+down_revision = 'd2b7a3c91f08'
+branch_labels = None
+depends_on = None
+
+
+def table_exists(table_name):
+    """Check if a table exists in the database."""
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade():
+    if table_exists('email_outbox'):
+        return
+    op.create_table(
+        'email_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('recipients', sa.JSON(), nullable=False),
+        sa.Column('sender', sa.String(length=120), nullable=True),
+        sa.Column('subject', sa.String(length=255), nullable=False),
+        sa.Column('template', sa.String(length=100), nullable=True),
+        sa.Column('context', sa.JSON(), nullable=True),
+        sa.Column('text_body', sa.Text(), nullable=True),
+        sa.Column('html_body', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('claimed_at', sa.DateTime(), nullable=True),
+        sa.Column('claimed_by', sa.String(length=64), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_email_outbox_status_available', 'email_outbox',
+                    ['status', 'available_at'], unique=False)
+
+
+def downgrade():
+    if table_exists('email_outbox'):
+        op.drop_index('ix_email_outbox_status_available', table_name='email_outbox')
+        op.drop_table('email_outbox')
@@ -0,0 +1,39 @@
+"""Add optimistic locking version columns to bookings and parking_slots
+
+Revision ID: f3a9d6b1c2e8
+Revises: e5f1c8a2d7b4
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9d6b1c2e8'
+down_revision = 'e5f1c8a2d7b4'
+branch_labels = None
+depends_on = None
+
+VERSIONED_TABLES = ['bookings', 'parking_slots']
+
+
+def column_exists(table_name, column_name):
+    """Check if a column exists in a table."""
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    return column_name in [col['name'] for col in inspector.get_columns(table_name)]
+
+
+def upgrade():
+    # Existing rows start at version 1, as new ones do
+    for table_name in VERSIONED_TABLES:
+        if not column_exists(table_name, 'version_id'):
+            op.add_column(table_name, sa.Column('version_id', sa.Integer(),
+                                                nullable=False, server_default='1'))
+
+
+def downgrade():
+    for table_name in VERSIONED_TABLES:
+        if column_exists(table_name, 'version_id'):
+            op.drop_column(table_name, 'version_id')
@@ -0,0 +1,134 @@
+"""
+Benchmark gate event ingestion through POST /parking/api/gate/events.
+Runs against a throwaway SQLite database, creates confirmed bookings for today
+and reports accepted events per second for fresh batches and for re-sent
+(duplicate) batches.
+Run this script from the main directory with:
+    python -m scripts.benchmark_gate_events [batches] [batch_size]
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Add the parent directory to path so we can import our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models.booking import Booking
+from app.models.parking_location import ParkingLocation
+from app.models.user import User
+from config.settings import Config
+from tabulate import tabulate
+
+GATE_KEY = "benchmark-gate-key"
+
+
+def make_app(db_path):
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
+        SQLALCHEMY_ECHO = False
+        GATE_API_KEYS = [GATE_KEY]
+        METRICS_ENABLED = False
+        SLOW_QUERY_LOG_ENABLED = False
+
+    return create_app(BenchmarkConfig)
+
+
+def create_bookings(count):
+    """Confirmed bookings valid right now; returns their ids."""
+    location = ParkingLocation.query.first()
+    if location is None:
+        location = ParkingLocation(
+            name="Benchmark", address="-", area="-", city="-", state="-",
+            pincode="0", latitude=0, longitude=0, total_slots=count,
+            hourly_rate=10, opening_time="00:00", closing_time="23:59",
+        )
+        db.session.add(location)
+    user = User(email=f"{uuid.uuid4().hex}@bench.local", username=uuid.uuid4().hex[:20])
+    user.set_password("benchmark")
+    db.session.add(user)
+    db.session.flush()
+
+    today = datetime.now().date()
+    bookings = [
+        Booking(
+            user_id=user.id,
+            parking_location_id=location.id,
+            vehicle_number=f"GJ01AB{i:04d}",
+            booking_date=today,
+            start_time=datetime.min.time(),
+            end_time=datetime.max.time().replace(microsecond=0),
+            duration_hours=24,
+            total_price=0,
+            booking_status="confirmed",
+            payment_status="paid",
+        )
+        for i in range(count)
+    ]
+    db.session.add_all(bookings)
+    db.session.commit()
+    return [booking.id for booking in bookings]
+
+
+def make_batch(booking_ids, batch_size):
+    now = time.time()
+    return [
+        {
+            "event_id": uuid.uuid4().hex,
+            "booking_id": booking_ids[i % len(booking_ids)],
+            "type": "entry",
+            "occurred_at": now,
+            "gate_id": "bench-1",
+        }
+        for i in range(batch_size)
+    ]
+
+
+def post_batches(client, batches):
+    accepted = 0
+    start = time.perf_counter()
+    for events in batches:
+        response = client.post(
+            "/parking/api/gate/events",
+            json={"events": events},
+            headers={"X-Gate-Key": GATE_KEY},
+        )
+        result = response.get_json()
+        accepted += result["accepted"] + result["duplicates"]
+    return accepted, time.perf_counter() - start
+
+
+def run_benchmark(batches=20, batch_size=500):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, "benchmark.db"))
+        with app.app_context():
+            db.create_all()
+            booking_ids = create_bookings(batch_size)
+
+        client = app.test_client()
+        payloads = [make_batch(booking_ids, batch_size) for _ in range(batches)]
+
+        rows = []
+        for label, data in (("new events", payloads), ("re-sent (duplicates)", payloads)):
+            processed, elapsed = post_batches(client, data)
+            rows.append(
+                [
+                    label,
+                    processed,
+                    f"{elapsed / len(data) * 1000:.1f}",
+                    f"{processed / elapsed:,.0f}",
+                ]
+            )
+
+    print(f"Gate event ingestion, {batches} batches of {batch_size} events (SQLite)")
+    print(tabulate(rows, headers=["Run", "events", "ms/batch", "events/sec"], tablefmt="grid"))
+
+
+if __name__ == "__main__":
+    run_benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 500,
+    )
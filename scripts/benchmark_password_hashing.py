@@ -0,0 +1,71 @@
+"""
+Benchmark password hashing through app.utils.passwords.
+For each hash method, hashes a fixed number of passwords on the bounded
+hashing pool with 1 worker and with one worker per CPU, and reports hashes per
+second, hashes per second per core and the latency of a single hash. One login
+costs one hash check, so hashes/sec/core is also the login capacity per core.
+Run this script from the main directory with:
+    python -m scripts.benchmark_password_hashing [hashes] [--method METHOD ...]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to path so we can import our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.passwords import PasswordHasher
+from config.settings import Config
+from tabulate import tabulate
+
+
+def measure(method, workers, hashes):
+    hasher = PasswordHasher()
+    hasher.configure(method, workers=workers, max_pending=hashes)
+    hasher.hash("warm-up")
+
+    start = time.perf_counter()
+    # One caller thread per hash, like concurrent login requests
+    with ThreadPoolExecutor(max_workers=workers * 2) as callers:
+        list(callers.map(hasher.hash, (f"password-{i}" for i in range(hashes))))
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hasher.verify(hasher.hash("single"), "single")
+    single = (time.perf_counter() - start) / 2
+    return hashes / elapsed, single
+
+
+def run_benchmark(hashes=20, methods=None):
+    cpus = os.cpu_count() or 1
+    methods = methods or [Config.PASSWORD_HASH_METHOD]
+    rows = []
+    for method in methods:
+        for workers in sorted({1, cpus}):
+            rate, single = measure(method, workers, hashes)
+            rows.append(
+                [
+                    method,
+                    workers,
+                    f"{rate:.1f}",
+                    f"{rate / workers:.1f}",
+                    f"{single * 1000:.1f}",
+                ]
+            )
+    print(
+        tabulate(
+            rows,
+            headers=["method", "workers", "hashes/sec", "hashes/sec/core", "single hash (ms)"],
+            tablefmt="grid",
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("hashes", nargs="?", type=int, default=20)
+    parser.add_argument("--method", action="append", dest="methods")
+    args = parser.parse_args()
+    run_benchmark(args.hashes, args.methods)
@@ -0,0 +1,56 @@
+"""
+Benchmark application startup, i.e. what every server worker pays on boot.
+Reports the time to import the app package, the time per create_app call and
+the number of SQL statements create_app sends to the database (which should
+be zero: table creation, the admin user and seeding are CLI commands now).
+Run this script from the main directory with:
+    python -m scripts.benchmark_startup [iterations]
+"""
+import os
+import statistics
+import sys
+import time
+
+# Add the parent directory to path so we can import our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+start = time.perf_counter()
+from app import create_app
+import_time = time.perf_counter() - start
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from tabulate import tabulate
+
+statements = 0
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+def run_benchmark(iterations=20):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        create_app()
+        timings.append(time.perf_counter() - start)
+
+    print(
+        tabulate(
+            [
+                ["import app (ms)", f"{import_time * 1000:.1f}"],
+                ["create_app first call (ms)", f"{timings[0] * 1000:.1f}"],
+                ["create_app median (ms)", f"{statistics.median(timings) * 1000:.1f}"],
+                ["create_app max (ms)", f"{max(timings) * 1000:.1f}"],
+                ["SQL statements per create_app", statements / iterations],
+            ],
+            tablefmt="grid",
+        )
+    )
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,133 @@
+"""
+Benchmark ticket PDF generation: the old tempfile-based QR hand-off versus the
+in-memory pipeline used by app.parking.tickets.
+Reports latency per ticket and the number of filesystem operations (counted
+through Python audit events) each path performs.
+Run this script from the main directory with:
+    python -m scripts.benchmark_ticket_pdf [iterations]
+"""
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, time as dtime
+from types import SimpleNamespace
+
+# Add the parent directory to path so we can import our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.parking.gate import ticket_signer
+from app.parking.tickets import render_qr_png, render_ticket_pdf, ticket_details
+from fpdf import FPDF
+from tabulate import tabulate
+
+# Audit events that correspond to filesystem syscalls
+FS_EVENTS = {"open", "os.remove", "os.unlink", "os.rename", "os.replace", "tempfile.mkstemp"}
+
+fs_ops = Counter()
+counting = False
+
+
+def audit_hook(event, args):
+    if counting and event in FS_EVENTS:
+        fs_ops[event] += 1
+
+
+def sample_ticket():
+    booking = SimpleNamespace(
+        id=1042,
+        ticket_version=1,
+        updated_at=datetime(2025, 5, 1, 9, 30),
+        vehicle_number="GJ01AB1234",
+        vehicle_type="four-wheeler",
+        booking_date=date(2025, 5, 1),
+        start_time=dtime(10, 0),
+        end_time=dtime(13, 30),
+        payment_status="paid",
+    )
+    location = SimpleNamespace(
+        name="Alpha One Mall Parking", address="Vastrapur Lake, Ahmedabad, Gujarat"
+    )
+    slot = SimpleNamespace(slot_number="F012", hourly_rate=50.0)
+    return booking, location, slot
+
+
+def render_with_tempfile(booking, location, slot, qr_png):
+    """The previous implementation: write the QR to disk and let FPDF read it back."""
+    _, duration_hours, total_price = ticket_details(booking, location, slot)
+    qr_file = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
+    qr_file.write(qr_png)
+    qr_file.close()
+    try:
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_font("Helvetica", "B", 16)
+        pdf.cell(190, 10, "PARKING TICKET", align="C", new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font("Helvetica", "", 12)
+        for line in [
+            f"Booking ID: {booking.id}",
+            f"Parking Location: {location.name}",
+            f"Address: {location.address}",
+            f"Vehicle Number: {booking.vehicle_number}",
+            f"Vehicle Type: {booking.vehicle_type}",
+            f'Date: {booking.booking_date.strftime("%Y-%m-%d")}',
+            f'Time: {booking.start_time.strftime("%H:%M")} to {booking.end_time.strftime("%H:%M")}',
+            f"Slot Number: {slot.slot_number}",
+            f"Duration: {round(duration_hours, 1)} hours",
+            f"Total Price: Rs.{round(total_price, 2)}",
+            f"Payment Status: {booking.payment_status.title()}",
+        ]:
+            pdf.cell(190, 10, line, new_x="LMARGIN", new_y="NEXT")
+        pdf.image(qr_file.name, x=75, y=160, w=60)
+        pdf.set_font("Helvetica", "I", 10)
+        pdf.cell(190, 10, "Instructions:", new_x="LMARGIN", new_y="NEXT")
+        pdf.multi_cell(
+            190,
+            5,
+            "1. Show this ticket to the parking attendant.\n2. Please park your vehicle in the designated slot.\n3. Contact support at support@smartparking.com for assistance.",
+        )
+        return bytes(pdf.output())
+    finally:
+        os.remove(qr_file.name)
+
+
+def measure(label, render, iterations, *args):
+    global counting
+    fs_ops.clear()
+    render(*args)  # warm up fonts and imports
+
+    fs_ops.clear()
+    counting = True
+    start = time.perf_counter()
+    for _ in range(iterations):
+        render(*args)
+    elapsed = time.perf_counter() - start
+    counting = False
+
+    total_ops = sum(fs_ops.values())
+    return [
+        label,
+        f"{elapsed / iterations * 1000:.2f}",
+        f"{total_ops / iterations:.1f}",
+        ", ".join(f"{k}={v // iterations}" for k, v in sorted(fs_ops.items())) or "-",
+    ]
+
+
+def run_benchmark(iterations=200):
+    sys.addaudithook(audit_hook)
+    ticket_signer.configure("benchmark-signing-key")
+    booking, location, slot = sample_ticket()
+    qr_data, _, _ = ticket_details(booking, location, slot)
+    qr_png = render_qr_png(qr_data)
+
+    rows = [
+        measure("tempfile", render_with_tempfile, iterations, booking, location, slot, qr_png),
+        measure("in-memory", render_ticket_pdf, iterations, booking, location, slot, qr_png),
+    ]
+    print(f"Ticket PDF rendering, {iterations} iterations")
+    print(tabulate(rows, headers=["Path", "ms/ticket", "fs ops/ticket", "breakdown"], tablefmt="grid"))
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,141 @@
+"""
+Check email delivery against a local SMTP stand-in.
+Starts a minimal SMTP server on localhost, sends a burst of messages through
+send_email and reports how many messages arrived over how many SMTP
+connections. By default the in-process worker pool is used and shut down
+(which drains its queue); with --outbox the messages go to the email_outbox
+table of the configured database and are delivered by the outbox sender.
+With --drop N the stand-in hangs up on the first N connections to exercise
+reconnects/retries. Exits with status 1 if any message was lost.
+Run this script from the main directory with:
+    python -m scripts.check_email_dispatcher [messages] [--drop N] [--outbox]
+"""
+import argparse
+import os
+import socketserver
+import sys
+import threading
+import time
+
+# Add the parent directory to path so we can import our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models.email_outbox import EmailOutbox
+from app.utils.email import send_email
+from app.utils.email_dispatcher import email_dispatcher
+from app.utils.email_outbox import OutboxSender
+from config.settings import Config
+from tabulate import tabulate
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Accepts SMTP sessions and counts connections and delivered messages."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, drop_connections=0):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.drop_connections = drop_connections
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            drop = server.connections <= server.drop_connections
+        if drop:
+            return
+        self.reply("220 localhost stand-in")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii", "replace").strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 localhost")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with server.lock:
+                    server.messages += 1
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                # MAIL, RCPT, RSET, NOOP
+                self.reply("250 OK")
+
+
+def run_check(messages=200, drop=0, outbox=False):
+    server = SMTPStandIn(drop_connections=drop)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    class StandInConfig(Config):
+        MAIL_SERVER = "127.0.0.1"
+        MAIL_PORT = server.server_address[1]
+        MAIL_USE_TLS = False
+        MAIL_USE_SSL = False
+        MAIL_USERNAME = None
+        MAIL_PASSWORD = None
+        MAIL_DEFAULT_SENDER = "noreply@smartparking.local"
+        EMAIL_RETRY_BACKOFF_SECONDS = 0.05
+        EMAIL_BACKEND = "outbox" if outbox else "pool"
+
+    app = create_app(StandInConfig)
+    subject = f"Dispatcher check {time.time()}"
+    start = time.perf_counter()
+    with app.app_context():
+        for i in range(messages):
+            send_email(subject, [f"user{i}@example.com"], "Hello")
+        # Outbox rows are only written with the caller's commit
+        db.session.commit()
+    queued = time.perf_counter() - start
+    if outbox:
+        with app.app_context():
+            sender = OutboxSender(app)
+            # Retried rows become due again after the (short) backoff
+            while EmailOutbox.query.filter_by(subject=subject, status="pending").count():
+                sender.run(once=True)
+                time.sleep(StandInConfig.EMAIL_RETRY_BACKOFF_SECONDS)
+            EmailOutbox.query.filter_by(subject=subject).delete()
+            db.session.commit()
+    else:
+        email_dispatcher.shutdown()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    print(
+        tabulate(
+            [
+                ["messages sent", messages],
+                ["messages received", server.messages],
+                ["SMTP connections", server.connections],
+                ["dropped connections", drop],
+                ["backend", "outbox" if outbox else "pool"],
+                ["enqueue time (ms)", f"{queued * 1000:.1f}"],
+                ["total time incl. drain (ms)", f"{elapsed * 1000:.1f}"],
+            ],
+            tablefmt="grid",
+        )
+    )
+    return server.messages == messages
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("messages", nargs="?", type=int, default=200)
+    parser.add_argument("--drop", type=int, default=0)
+    parser.add_argument("--outbox", action="store_true")
+    args = parser.parse_args()
+    sys.exit(0 if run_check(args.messages, args.drop, args.outbox) else 1)
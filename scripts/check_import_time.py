@@ -0,0 +1,91 @@
+"""
+Check how long a worker spends importing modules on startup.
+Runs ``from app import create_app; create_app()`` in a fresh interpreter with
+``python -X importtime`` (a few times, keeping the fastest run), prints the
+modules with the largest cumulative import time and the total, and exits with
+status 1 if the total exceeds the budget or if a dependency that should be
+loaded lazily (see app.utils.lazy) was imported during startup.
+Run this script from the main directory with:
+    python -m scripts.check_import_time [--budget-ms MS] [--runs N] [--top N]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+from tabulate import tabulate
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+STARTUP_CODE = "from app import create_app; create_app()"
+
+# Only needed by ticket rendering and the location import scripts
+LAZY_MODULES = ["qrcode", "fpdf", "PIL", "geopy", "requests"]
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def measure_imports():
+    """Return ``[(module, self_us, cumulative_us, depth)]`` for one startup."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_CODE],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"Startup failed:\n{result.stderr[-2000:]}")
+    imports = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return imports
+
+
+def run_check(budget_ms=1100, runs=3, top=15):
+    imports = min(
+        (measure_imports() for _ in range(runs)),
+        key=lambda run: sum(self_us for _, self_us, _, _ in run),
+    )
+    total_ms = sum(self_us for _, self_us, _, _ in imports) / 1000
+
+    rows = [
+        [module, f"{self_us / 1000:.1f}", f"{cumulative_us / 1000:.1f}"]
+        for module, self_us, cumulative_us, depth in sorted(
+            (entry for entry in imports if entry[3] == 0), key=lambda entry: -entry[2]
+        )[:top]
+    ]
+    print(
+        tabulate(
+            rows, headers=["module", "self (ms)", "cumulative (ms)"], tablefmt="grid"
+        )
+    )
+
+    loaded = {module for module, _, _, _ in imports}
+    eager = [
+        name
+        for name in LAZY_MODULES
+        if name in loaded or any(module.startswith(f"{name}.") for module in loaded)
+    ]
+    print(f"Total import time: {total_ms:.1f} ms (budget {budget_ms} ms), {len(imports)} modules")
+
+    ok = True
+    if total_ms > budget_ms:
+        print(f"FAIL: startup import time is over budget by {total_ms - budget_ms:.1f} ms")
+        ok = False
+    if eager:
+        print(f"FAIL: imported at startup but should be lazy: {', '.join(eager)}")
+        ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-ms", type=float, default=1100)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    sys.exit(0 if run_check(args.budget_ms, args.runs, args.top) else 1)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+Script to check that the hot queries of the application are served by an index.
+The statements are not written out here: the model methods and admin queries
+are called against an empty in-memory SQLite schema built from the models, and
+the statements they run are captured, so the check follows the code. Each one
+is EXPLAINed on that schema, and on the configured database when it is MySQL.
+Exits with status 1 if any query falls back to a full table scan.
+Run this script from the main directory with:
+    python -m scripts.check_query_plans
+"""
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.booking import Booking
+from app.models.parking_slot import ParkingSlot
+from app.models.user import User
+from config.settings import Config
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from tabulate import tabulate
+
+
+class CheckConfig(Config):
+    # Where the hot queries are run to capture their statements
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    DATABASE_REPLICA_URL = None
+    SQLALCHEMY_ECHO = False
+    METRICS_ENABLED = False
+    SLOW_QUERY_LOG_ENABLED = False
+
+
+def captured_statements(call):
+    """Run ``call()`` and return the statements it executed through the ORM."""
+    statements = []
+
+    def record(orm_execute_state):
+        statements.append(orm_execute_state.statement)
+
+    # On Session itself, so jobs running in a session of their own are seen too
+    event.listen(Session, "do_orm_execute", record)
+    try:
+        call()
+    finally:
+        event.remove(Session, "do_orm_execute", record)
+    return statements
+
+
+def hot_queries():
+    """The statements behind the busiest model classmethods and admin views."""
+    from app.admin.routes import admin_context
+
+    calls = {
+        "ParkingSlot.get_available_slots": lambda: ParkingSlot.get_available_slots(
+            1, "four-wheeler"
+        ),
+        "ParkingSlot.count_available": lambda: ParkingSlot.count_available(1),
+        "Booking.get_user_bookings": lambda: Booking.get_user_bookings(1),
+        "Booking.release_expired_slots": Booking.release_expired_slots,
+        "Booking.get_paid_bookings": Booking.get_paid_bookings,
+        "admin revenue": admin_context,
+        "User.verify_token": lambda: User.verify_token("token"),
+    }
+    queries = {}
+    for name, call in calls.items():
+        statements = captured_statements(call)
+        for i, stmt in enumerate(statements, 1):
+            queries[name if len(statements) == 1 else f"{name} #{i}"] = stmt
+    return queries
+
+
+def explain(conn, stmt):
+    """Run EXPLAIN for a statement and return the plan rows as dicts."""
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    result = conn.exec_driver_sql(prefix + str(compiled), params)
+    return [dict(row._mapping) for row in result]
+
+
+def full_scans(dialect_name, plan):
+    """Return the plan steps that read a whole table instead of an index."""
+    if dialect_name == "sqlite":
+        # "SCAN bookings" is a full scan, "SCAN bookings USING INDEX ..." is not
+        return [
+            row["detail"]
+            for row in plan
+            if row["detail"].startswith("SCAN ") and " USING " not in row["detail"]
+        ]
+    if dialect_name == "mysql":
+        return [f"{row['table']}: type=ALL" for row in plan if row.get("type") == "ALL"]
+    return []
+
+
+def check_engine(engine, queries):
+    """EXPLAIN every hot query on ``engine``; return (report rows, failure count)."""
+    rows = []
+    failures = 0
+    with engine.connect() as conn:
+        for name, stmt in queries.items():
+            scans = full_scans(engine.dialect.name, explain(conn, stmt))
+            if scans:
+                failures += 1
+                rows.append([engine.dialect.name, name, "❌ Full scan: " + "; ".join(scans)])
+            else:
+                rows.append([engine.dialect.name, name, "✅ Uses index"])
+    return rows, failures
+
+
+def check_query_plans():
+    """Check the query plans and return the number of queries doing full scans."""
+    print("Checking query plans for hot queries...")
+
+    db.create_all()
+    queries = hot_queries()
+    engines = [db.engine]
+
+    if Config.SQLALCHEMY_DATABASE_URI.startswith("mysql"):
+        try:
+            mysql_engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
+            with mysql_engine.connect():
+                engines.append(mysql_engine)
+        except Exception as e:
+            print(f"Warning: MySQL not reachable, skipping MySQL plans: {e}")
+
+    report = []
+    failures = 0
+    for engine in engines:
+        rows, engine_failures = check_engine(engine, queries)
+        report.extend(rows)
+        failures += engine_failures
+
+    print(tabulate(report, headers=["Database", "Query", "Plan"], tablefmt="grid"))
+    if failures:
+        print(f"\n{failures} queries fall back to a full table scan")
+    else:
+        print("\nAll hot queries use an index")
+    return failures
+
+
+if __name__ == "__main__":
+    app = create_app(CheckConfig)
+    with app.app_context():
+        sys.exit(1 if check_query_plans() else 0)
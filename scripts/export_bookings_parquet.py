@@ -0,0 +1,216 @@
+"""
+Script to export booking history (joined with location and slot data) to
+partitioned Parquet files for analytics.
+Run this script from the main directory with:
+    python -m scripts.export_bookings_parquet --output exports/bookings
+
+Each run only exports bookings created or updated since the watermark saved by
+the previous run. Files are laid out Hive-style as
+    <output>/month=YYYY-MM/location_id=<id>/part-<run>-<n>.parquet
+A booking that changes after it was exported shows up again in a later run,
+so readers should keep the row with the latest ``updated_at`` per ``id``.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# Add the parent directory to path so we can import our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models.booking import Booking
+from app.models.parking_location import ParkingLocation
+from app.models.parking_slot import ParkingSlot
+from flask import current_app
+from sqlalchemy import and_, or_
+
+WATERMARK_FILE = "_watermark.json"
+DEFAULT_BATCH_SIZE = 5000
+
+EXPORT_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("user_id", pa.int64()),
+    ("location_id", pa.int64()),
+    ("location_name", pa.string()),
+    ("location_area", pa.string()),
+    ("location_city", pa.string()),
+    ("parking_slot_id", pa.int64()),
+    ("slot_number", pa.string()),
+    ("slot_hourly_rate", pa.float64()),
+    ("vehicle_number", pa.string()),
+    ("vehicle_type", pa.string()),
+    ("booking_date", pa.date32()),
+    ("start_time", pa.time32("s")),
+    ("end_time", pa.time32("s")),
+    ("duration_hours", pa.float64()),
+    ("total_price", pa.float64()),
+    ("payment_method", pa.string()),
+    ("payment_status", pa.string()),
+    ("booking_status", pa.string()),
+    ("created_at", pa.timestamp("us")),
+    ("updated_at", pa.timestamp("us")),
+    ("month", pa.string()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("month", pa.string()), ("location_id", pa.int64())]),
+    flavor="hive",
+)
+
+
+def load_watermark(output_dir):
+    """Return the (updated_at, id) pair the previous run stopped at."""
+    path = os.path.join(output_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return None, 0
+    with open(path) as f:
+        data = json.load(f)
+    return datetime.fromisoformat(data["updated_at"]), data["id"]
+
+
+def save_watermark(output_dir, updated_at, booking_id):
+    """Persist the watermark atomically so a crashed run is simply retried."""
+    path = os.path.join(output_dir, WATERMARK_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"updated_at": updated_at.isoformat(), "id": booking_id}, f)
+    os.replace(tmp_path, path)
+
+
+def build_query(changed_at, since, since_id, batch_size):
+    """Keyset-paginated query for the next batch of changed bookings."""
+    query = (
+        db.session.query(
+            Booking.id,
+            Booking.user_id,
+            Booking.parking_location_id,
+            ParkingLocation.name,
+            ParkingLocation.area,
+            ParkingLocation.city,
+            Booking.parking_slot_id,
+            ParkingSlot.slot_number,
+            ParkingSlot.hourly_rate,
+            Booking.vehicle_number,
+            Booking.vehicle_type,
+            Booking.booking_date,
+            Booking.start_time,
+            Booking.end_time,
+            Booking.duration_hours,
+            Booking.total_price,
+            Booking.payment_method,
+            Booking.payment_status,
+            Booking.booking_status,
+            Booking.created_at,
+            changed_at,
+        )
+        .join(ParkingLocation, Booking.parking_location_id == ParkingLocation.id)
+        .outerjoin(ParkingSlot, Booking.parking_slot_id == ParkingSlot.id)
+    )
+    if since is not None:
+        query = query.filter(
+            or_(changed_at > since, and_(changed_at == since, Booking.id > since_id))
+        )
+    return query.order_by(changed_at, Booking.id).limit(batch_size)
+
+
+def iter_batches(app, since, since_id, batch_size, progress):
+    """
+    Yield one Arrow record batch per page of bookings.
+
+    Only ``batch_size`` rows are held in memory at a time; the last key seen is
+    stored in ``progress`` so the caller can advance the watermark afterwards.
+    Pyarrow pulls batches from its own thread, so the app context is pushed here.
+    """
+    changed_at = db.func.coalesce(Booking.updated_at, Booking.created_at)
+    columns = [field.name for field in EXPORT_SCHEMA if field.name != "month"]
+
+    while True:
+        with app.app_context():
+            rows = build_query(changed_at, since, since_id, batch_size).all()
+        if not rows:
+            return
+
+        data = {name: [] for name in columns}
+        data["month"] = []
+        for row in rows:
+            for name, value in zip(columns, row):
+                data[name].append(value)
+            data["month"].append(row.booking_date.strftime("%Y-%m"))
+
+        since, since_id = rows[-1][-1], rows[-1][0]
+        progress["updated_at"], progress["id"] = since, since_id
+        progress["rows"] += len(rows)
+
+        yield pa.RecordBatch.from_pydict(data, schema=EXPORT_SCHEMA)
+
+        if len(rows) < batch_size:
+            return
+
+
+def export_bookings(output_dir, batch_size=DEFAULT_BATCH_SIZE, full=False):
+    """Export bookings changed since the last watermark into ``output_dir``."""
+    os.makedirs(output_dir, exist_ok=True)
+    since, since_id = (None, 0) if full else load_watermark(output_dir)
+    if since is not None:
+        print(f"Exporting bookings changed after {since.isoformat()} (id > {since_id})")
+    else:
+        print("Exporting all bookings")
+
+    progress = {"updated_at": None, "id": None, "rows": 0}
+    reader = pa.RecordBatchReader.from_batches(
+        EXPORT_SCHEMA,
+        iter_batches(
+            current_app._get_current_object(), since, since_id, batch_size, progress
+        ),
+    )
+    run_id = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+
+    ds.write_dataset(
+        reader,
+        output_dir,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"part-{run_id}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+    if progress["rows"]:
+        save_watermark(output_dir, progress["updated_at"], progress["id"])
+        print(f"Exported {progress['rows']} bookings to {output_dir}")
+    else:
+        print("No new bookings to export")
+    return progress["rows"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Export bookings to partitioned Parquet files."
+    )
+    parser.add_argument(
+        "--output", default="exports/bookings", help="Output directory for the dataset"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Number of bookings fetched per round trip",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore the saved watermark and export every booking",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    app = create_app()
+    with app.app_context():
+        export_bookings(args.output, batch_size=args.batch_size, full=args.full)
@@ -5,10 +5,8 @@ and add them to the database.
 
 import os
 import sys
-import requests
 import random
 from datetime import time, datetime
-from geopy.geocoders import Nominatim
 
 # Add the parent directory to path so we can import our app
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -16,6 +14,10 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from app import create_app, db
 from app.models.parking_location import ParkingLocation
 from app.models.parking_slot import ParkingSlot
+from app.utils.lazy import lazy_import
+
+requests = lazy_import("requests")
+geocoders = lazy_import("geopy.geocoders")
 
 # Overpass API endpoint
 OVERPASS_API = "https://overpass-api.de/api/interpreter"
@@ -60,7 +62,7 @@ def fetch_from_overpass():
 def generate_area_name(lat, lon):
     """Generate area name for a location using reverse geocoding."""
     try:
-        geolocator = Nominatim(user_agent="smart_parking_system")
+        geolocator = geocoders.Nominatim(user_agent="smart_parking_system")
         location = geolocator.reverse(f"{lat}, {lon}", exactly_one=True)
         address = location.raw.get('address', {})
         